@@ -1,15 +1,16 @@
-from pathlib import Path
+import functools
 
 import dash
 import dash_bootstrap_components as dbc
-import pandas as pd
-from flask import Flask
+from flask import Flask, request
 from flask.helpers import get_root_path
 from flask_login import LoginManager, login_required
 from flask_sqlalchemy import SQLAlchemy
 from flask_uploads import UploadSet, IMAGES, configure_uploads
 from flask_wtf.csrf import CSRFProtect
 
+from example_app.fast_json import configure_json
+
 csrf = CSRFProtect()
 csrf._exempt_views.add('dash.dash.dispatch')
 db = SQLAlchemy()
@@ -25,6 +26,10 @@ def create_app(config_class_name):
     """
     app = Flask(__name__)
     app.config.from_object(config_class_name)
+    configure_json(app)
+    # Imported here so that 'python -m example_app.compression' does not import the module twice
+    from example_app.compression import init_compression
+    init_compression(app)
 
     register_dashapp(app)
 
@@ -37,7 +42,12 @@ def create_app(config_class_name):
     with app.app_context():
         from example_app.models import User, Profile, Region
         db.create_all()
-        add_noc_data(db)
+        if app.config['SEED_ON_STARTUP']:
+            from example_app.seed import seed_all
+            seed_all()
+
+    from example_app.search import init_profile_search
+    init_profile_search(app)
 
     from example_app.main.routes import main_bp
     app.register_blueprint(main_bp)
@@ -48,27 +58,18 @@ def create_app(config_class_name):
     return app
 
 
-def add_noc_data(db_name):
-    """ Adds the list of countries to the NOCRegion table to the database.
-    :param db_name: the SQLite database initialised for the Flask app
-    :type db_name: SQLAlchemy object
-    """
-    filename = Path(__file__).parent.joinpath('paralympic_app', 'data', 'noc_regions.csv')
-    df = pd.read_csv(filename, usecols=['region'])
-    df.dropna(axis=0, inplace=True)
-    df.drop_duplicates(subset=['region'], keep='first', inplace=True)
-    df.reset_index(drop=True, inplace=True)
-    df['id'] = df.index
-    df.to_sql(name='region', con=db.engine, if_exists='replace', index=False)
-
-
 def register_dashapp(app):
     """ Registers the Dash app in the Flask app and make it accessible on the route /dashboard/ """
     from example_app.paralympic_app import layout
-    from example_app.paralympic_app.callbacks import register_callbacks
+    from example_app.paralympic_app.callback_metrics import register_metrics_view
+    from example_app.paralympic_app.callbacks import register_callbacks, find_pure_callbacks
+    from example_app.paralympic_app.figure_routes import figures_bp
 
     meta_viewport = {"name": "viewport", "content": "width=device-width, initial-scale=1, shrink-to-fit=no"}
 
+    _configure_tile_proxy(app)
+    _start_figure_render_pool(app)
+
     dashapp = dash.Dash(__name__,
                          server=app,
                          url_base_pathname='/dashboard/',
@@ -78,11 +79,25 @@ def register_dashapp(app):
 
     with app.app_context():
         dashapp.title = 'Dashboard'
+        # The layout is a function so its figures are only built when the dashboard is first requested
+        dashapp.validation_layout = layout.validation_layout()
         dashapp.layout = layout.layout
         register_callbacks(dashapp)
 
+    pure_callbacks = find_pure_callbacks(dashapp)
+    if pure_callbacks:
+        app.logger.info('Dashboard callbacks that could run client-side: %s', ', '.join(pure_callbacks))
+    app.logger.info('Dashboard figures deferred until first request: %s',
+                    ', '.join(component_id for component_id, figure in layout.startup_report().items()
+                              if figure['status'] == 'deferred'))
+
+    register_metrics_view(dashapp)
+
     # Protects the views with Flask-Login
     _protect_dash_views(dashapp)
+    _add_layout_etag(dashapp)
+
+    app.register_blueprint(figures_bp)
 
 
 def _protect_dash_views(dash_app):
@@ -92,3 +107,46 @@ def _protect_dash_views(dash_app):
             dash_app.server.view_functions[view_func] = login_required(dash_app.server.view_functions[view_func])
 
 
+def _add_layout_etag(dash_app):
+    """ Adds an ETag to the Dash layout response so browsers can revalidate it rather than download it again """
+    endpoint = dash_app.config.routes_pathname_prefix + '_dash-layout'
+    serve_layout = dash_app.server.view_functions[endpoint]
+
+    @functools.wraps(serve_layout)
+    def serve_layout_with_etag(*args, **kwargs):
+        response = serve_layout(*args, **kwargs)
+        response.add_etag()
+        return response.make_conditional(request)
+
+    dash_app.server.view_functions[endpoint] = serve_layout_with_etag
+
+
+def _configure_tile_proxy(app):
+    """
+    Serves the map tiles from a local tile cache if TILE_PROXY_ENABLED is set, and sets TILE_PROXY_URL so that the map
+    figures of this app load their tiles from it
+    """
+    from paralympic_app.map_tiles import TileCache
+    from example_app.paralympic_app.tile_routes import tiles_bp
+
+    if not app.config.get('TILE_PROXY_ENABLED'):
+        return
+    app.extensions['tile_cache'] = TileCache(app.config['TILE_CACHE_DIR'],
+                                             max_bytes=app.config.get('TILE_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+                                             fetch=app.config.get('TILE_PROXY_FETCH', True),
+                                             timeout=app.config.get('TILE_PROXY_TIMEOUT', 10))
+    app.register_blueprint(tiles_bp)
+    app.config['TILE_PROXY_URL'] = tiles_bp.url_prefix + '/{source}/{z}/{x}/{y}'
+
+
+def _start_figure_render_pool(app):
+    """ Builds the dashboard figures in worker processes if FIGURE_RENDER_PROCESSES is set """
+    import paralympic_app.create_charts as cc
+    from paralympic_app.render_pool import FigureRenderPool
+
+    processes = app.config.get('FIGURE_RENDER_PROCESSES')
+    if not processes or cc.figure_cache.renderer is not None:
+        return
+    pool = FigureRenderPool(processes=processes, timeout=app.config.get('FIGURE_RENDER_TIMEOUT', 30))
+    cc.figure_cache.renderer = pool.start().render
+    app.extensions['figure_render_pool'] = pool
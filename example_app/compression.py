@@ -0,0 +1,300 @@
+""" Compresses responses with brotli or gzip, whichever the client accepts, and serves precompressed static files.
+
+Brotli needs 'pip install brotli'; without it responses are only gzipped. Static files, from the Flask static folder
+and the Dash assets folder, are compressed ahead of time with:
+
+    python -m example_app.compression
+
+which writes a .gz, and a .br if brotli is installed, next to each text file. A static file with an up to date
+precompressed copy is sent as that copy; other static files are compressed as they are streamed.
+"""
+import gzip
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+from flask import current_app, request
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing; images such as the logos are already compressed
+COMPRESS_MIMETYPES = ('text/html', 'text/css', 'text/plain', 'text/csv', 'application/json', 'application/javascript',
+                      'text/javascript', 'image/svg+xml')
+PRECOMPRESS_SUFFIXES = ('.css', '.js', '.map', '.json', '.geojson', '.svg', '.html', '.txt', '.csv')
+PRECOMPRESS_DIRS = (Path(__file__).parent.joinpath('static'), Path(__file__).parent.joinpath('dashboard', 'assets'))
+# File suffix of each encoding, in order of preference
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+# Size of the pieces a streamed body is compressed in
+CHUNK_SIZE = 64 * 1024
+
+
+def init_compression(app):
+    """
+    Compresses the responses of a Flask app, and of any Dash app it serves. Configured with:
+
+    COMPRESS_MIN_SIZE: bytes, smaller responses are sent as they are
+    COMPRESS_STREAM_MIN_SIZE: bytes, larger responses are compressed a chunk at a time as they are sent rather than
+    all at once before sending
+    COMPRESS_LEVEL: gzip level, 1 (fastest) to 9 (smallest)
+    COMPRESS_BROTLI_QUALITY: brotli quality, 0 (fastest) to 11 (smallest)
+    COMPRESS_CACHE_SIZE: number of compressed responses kept, see ResponseCompressor
+    """
+    compressor = ResponseCompressor(min_size=app.config.get('COMPRESS_MIN_SIZE', 500),
+                                    stream_min_size=app.config.get('COMPRESS_STREAM_MIN_SIZE', 1024 * 1024),
+                                    level=app.config.get('COMPRESS_LEVEL', 6),
+                                    brotli_quality=app.config.get('COMPRESS_BROTLI_QUALITY', 4),
+                                    cache_size=app.config.get('COMPRESS_CACHE_SIZE', 64))
+    app.after_request(compressor.after_request)
+    app.extensions['compression'] = compressor
+    return compressor
+
+
+def accepted_encoding(accept_encodings, available=None):
+    """
+    :param accept_encodings: werkzeug Accept of the request's Accept-Encoding header
+    :param available: encodings that can be used, defaults to those that are installed
+    :return: str the preferred encoding of the client from ENCODINGS, or None if it accepts none of them
+    """
+    if available is None:
+        available = [encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None]
+    quality = {encoding: accept_encodings.quality(encoding) for encoding in available}
+    best = max(available, key=lambda encoding: quality[encoding], default=None)
+    return best if best is not None and quality[best] > 0 else None
+
+
+def compress(data, encoding, level=6, brotli_quality=4):
+    """
+    :param data: bytes to compress
+    :param encoding: str 'br' or 'gzip'
+    :return: bytes compressed data
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_chunks(chunks, encoding, level=6, brotli_quality=4):
+    """
+    Compresses an iterable of bytes lazily, for streamed responses.
+
+    :return: generator of bytes compressed data
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=brotli_quality)
+        compress_chunk, flush = compressor.process, compressor.finish
+    else:
+        # wbits of 16 + MAX_WBITS writes a gzip header and trailer
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress_chunk, flush = compressor.compress, compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            compressed = compress_chunk(chunk)
+            if compressed:
+                yield compressed
+        yield flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def precompressed_path(path, encoding):
+    """
+    :return: Path of the precompressed copy of a file, or None if there is none or it is older than the file
+    """
+    path = Path(path)
+    compressed = path.with_name(path.name + ENCODINGS[encoding])
+    try:
+        if compressed.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            return compressed
+    except OSError:
+        pass
+    return None
+
+
+def precompress_dir(directory, suffixes=PRECOMPRESS_SUFFIXES):
+    """
+    Writes a maximally compressed .gz, and a .br if brotli is installed, next to every file in a directory, and its
+    sub directories, with one of the suffixes. Up to date copies are left as they are.
+
+    :return: list of (Path file, encoding, original size, compressed size) for the copies written
+    """
+    written = []
+    for path in sorted(Path(directory).rglob('*')):
+        if not path.is_file() or path.suffix not in suffixes:
+            continue
+        data = None
+        for encoding, suffix in ENCODINGS.items():
+            if encoding == 'br' and brotli is None or precompressed_path(path, encoding):
+                continue
+            if data is None:
+                data = path.read_bytes()
+            compressed = compress(data, encoding, level=9, brotli_quality=11)
+            path.with_name(path.name + suffix).write_bytes(compressed)
+            written.append((path, encoding, len(data), len(compressed)))
+    return written
+
+
+class ResponseCompressor:
+    """
+    Compresses Flask responses, for use as an after_request function.
+
+    Responses built in memory that have an ETag, or that may be cached, such as the Dash layout and the fingerprinted
+    Dash JS bundles, are compressed once and kept compressed in an LRU cache. Other responses, such as callback
+    responses, are compressed at once and sent with a Content-Length, or if larger than stream_min_size compressed a
+    chunk at a time as they are sent.
+    Static files are sent precompressed if they have an up to date copy and otherwise streamed through the compressor.
+    The ETag of a response that may be sent compressed is made weak on both its 200 and 304 responses, and
+    If-None-Match is compared with it weakly, so a browser revalidating a compressed response gets a 304.
+
+    :param min_size: bytes, smaller responses are sent as they are
+    :param stream_min_size: bytes, larger responses are compressed a chunk at a time as they are sent
+    :param level: gzip level
+    :param brotli_quality: brotli quality
+    :param cache_size: number of compressed responses kept, 0 to keep none
+    """
+
+    def __init__(self, min_size=500, stream_min_size=1024 * 1024, level=6, brotli_quality=4, cache_size=64):
+        self.min_size = min_size
+        self.stream_min_size = stream_min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def after_request(self, response):
+        if response.status_code in (200, 304):
+            response.vary.add('Accept-Encoding')
+        if (response.status_code not in (200, 304) or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESS_MIMETYPES):
+            return response
+        encoding = accepted_encoding(request.accept_encodings)
+        if encoding is None or self._not_modified(response):
+            return response
+        if response.direct_passthrough:
+            return self._compress_file(response, encoding)
+        if response.is_streamed:
+            return self._stream(response, encoding)
+        size = len(response.get_data())
+        if size < self.min_size:
+            return response
+        key = self._cache_key(response, encoding)
+        body = self._cached(key)
+        if body is None and key is None and size >= self.stream_min_size:
+            return self._stream(response, encoding)
+        if body is None:
+            body = compress(response.get_data(), encoding, self.level, self.brotli_quality)
+            self._store(key, body)
+        response.set_data(body)
+        self._set_encoding(response, encoding)
+        return response
+
+    @staticmethod
+    def _not_modified(response):
+        """
+        Makes the ETag of a response that may be sent compressed weak, as the compressed body is a different
+        representation, so that the 200 response and the 304 a view sends on revalidation carry the same ETag. Views
+        that compare If-None-Match with the strong ETag, such as Dash's component suites, never match the weak ETag a
+        browser sends back, so a 200 response whose ETag matches it weakly is turned into a 304 here.
+
+        :return: bool whether the response is a 304
+        """
+        etag, weak = response.get_etag()
+        if etag is not None:
+            response.set_etag(etag, weak=True)
+            if response.status_code == 200 and request.if_none_match.contains_weak(etag):
+                response.make_conditional(request)
+        return response.status_code == 304
+
+    def _compress_file(self, response, encoding):
+        """ Swaps a static file for its precompressed copy, or compresses it as it is sent if it has none """
+        path = self._static_path()
+        if path is not None:
+            for available in ENCODINGS:
+                if available != encoding and request.accept_encodings.quality(available) <= 0:
+                    continue
+                compressed_path = precompressed_path(path, available)
+                if compressed_path is not None:
+                    response.response.close()
+                    response.response = wrap_file(request.environ, open(compressed_path, 'rb'))
+                    response.content_length = compressed_path.stat().st_size
+                    self._set_encoding(response, available)
+                    return response
+        if response.content_length is not None and response.content_length < self.min_size:
+            return response
+        return self._stream(response, encoding)
+
+    def _stream(self, response, encoding):
+        if response.is_streamed or response.direct_passthrough:
+            chunks = response.iter_encoded()
+        else:
+            data = response.get_data()
+            chunks = (data[start:start + CHUNK_SIZE] for start in range(0, len(data), CHUNK_SIZE))
+        response.response = compress_chunks(chunks, encoding, self.level, self.brotli_quality)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+        self._set_encoding(response, encoding)
+        return response
+
+    @staticmethod
+    def _set_encoding(response, encoding):
+        response.headers['Content-Encoding'] = encoding
+        # Byte ranges of the uncompressed file do not apply to the compressed body
+        response.headers.pop('Accept-Ranges', None)
+
+    @staticmethod
+    def _static_path():
+        """ :return: str path of the file a static endpoint, of the app or a blueprint, is sending, or None """
+        endpoint = request.endpoint or ''
+        if endpoint == 'static':
+            folder = current_app.static_folder
+        elif endpoint.endswith('.static') and endpoint[:-len('.static')] in current_app.blueprints:
+            folder = current_app.blueprints[endpoint[:-len('.static')]].static_folder
+        else:
+            return None
+        filename = (request.view_args or {}).get('filename')
+        return safe_join(folder, filename) if folder and filename else None
+
+    @staticmethod
+    def _cache_key(response, encoding):
+        etag, weak = response.get_etag()
+        if etag is not None:
+            return request.path, etag, encoding
+        if response.cache_control.max_age and not response.cache_control.private:
+            return request.path, None, encoding
+        return None
+
+    def _cached(self, key):
+        if key is None or not self.cache_size:
+            return None
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+            return body
+
+    def _store(self, key, body):
+        if key is None or not self.cache_size:
+            return
+        with self._lock:
+            self._cache[key] = body
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+if __name__ == '__main__':
+    dirs = [Path(arg) for arg in sys.argv[1:]] or PRECOMPRESS_DIRS
+    if brotli is None:
+        print('brotli is not installed, writing .gz files only')
+    for directory in dirs:
+        for file_path, file_encoding, size, compressed_size in precompress_dir(directory):
+            print(f'{compressed_size:>9} / {size:>9} {file_encoding:<4} {file_path}')
@@ -16,7 +16,27 @@ class Config(object):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(Path(__file__).parent.joinpath('my_example.sqlite'))
     TESTING = False
+    # Seed the reference data tables when the app starts, see seed.py; turn off when several workers share a database
+    SEED_ON_STARTUP = True
     UPLOADED_PHOTOS_DEST = Path(__file__).parent.joinpath("static/img")
+    # Number of worker processes that build the dashboard figures, 0 to build them in the request thread
+    FIGURE_RENDER_PROCESSES = 0
+    FIGURE_RENDER_TIMEOUT = 30
+    # 'orjson', 'json' or 'auto' to use orjson when it is installed, see fast_json.py
+    JSON_ENGINE = 'auto'
+    # Response compression, see compression.py; brotli is used when it is installed and the browser accepts it
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_STREAM_MIN_SIZE = 1024 * 1024
+    COMPRESS_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 4
+    COMPRESS_CACHE_SIZE = 64
+    # Serve the map tiles from a local cache at /dashboard/tiles, see paralympic_app/map_tiles.py; turn off
+    # TILE_PROXY_FETCH to only serve tiles already in the cache, e.g. when offline
+    TILE_PROXY_ENABLED = False
+    TILE_PROXY_FETCH = True
+    TILE_PROXY_TIMEOUT = 10
+    TILE_CACHE_DIR = Path(__file__).parent.parent.joinpath('paralympic_app', 'tiles')
+    TILE_CACHE_MAX_BYTES = 256 * 1024 * 1024
 
 
 class ProductionConfig(Config):
@@ -0,0 +1,81 @@
+import numpy as np
+import plotly.io as pio
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_ENGINES = ('auto', 'orjson', 'json')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that encodes with orjson, which also handles NumPy arrays and scalars. The indent of 2 and the
+    separators that jsonify passes are supported, orjson output being compact apart from indenting; anything orjson
+    cannot encode, and any other json.dumps option, falls back to the default provider.
+    """
+
+    def dumps(self, obj, **kwargs):
+        options = dict(kwargs)
+        # orjson has no spaces after separators, so it matches the compact separators jsonify asks for
+        options.pop('separators', None)
+        indent = options.pop('indent', None)
+        sort_keys = options.pop('sort_keys', self.sort_keys)
+        if options or indent not in (None, 2):
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def configure_json(app):
+    """
+    Chooses the JSON encoder for Flask responses and for Dash responses and figures, which Dash encodes with Plotly,
+    from the JSON_ENGINE config value: 'orjson', 'json' (the standard library), or 'auto' to use orjson if it is
+    installed. Falls back to 'json' if orjson is asked for but not installed.
+
+    :return: str the engine in use
+    """
+    engine = app.config.get('JSON_ENGINE', 'auto')
+    if engine not in JSON_ENGINES:
+        raise ValueError("JSON_ENGINE must be one of %r." % (JSON_ENGINES,))
+    if engine == 'orjson' and orjson is None:
+        app.logger.warning("JSON_ENGINE is 'orjson' but orjson is not installed, using json instead.")
+    use_orjson = engine != 'json' and orjson is not None
+    if use_orjson:
+        app.json = OrjsonProvider(app)
+        use_orjson = _responds_with_orjson(app)
+    pio.json.config.default_engine = 'orjson' if use_orjson else 'json'
+    return pio.json.config.default_engine
+
+
+def _responds_with_orjson(app):
+    """
+    Checks that jsonify responses are encoded by orjson, by encoding a NumPy value, which the default provider cannot,
+    and restores the default provider if they are not.
+
+    :return: bool whether orjson encodes the responses
+    """
+    try:
+        with app.app_context():
+            body = app.json.response({'check': np.int64(1)}).get_data()
+        if orjson.loads(body) == {'check': 1}:
+            return True
+    except TypeError:
+        pass
+    app.logger.warning("orjson is not encoding Flask responses, using json instead.")
+    app.json = DefaultJSONProvider(app)
+    return False
@@ -0,0 +1,325 @@
+""" Load test of the Flask app and dashboard with many simulated users at once, to check capacity before a release.
+
+Each simulated user signs up, logs in and creates a profile, then until the test ends repeatedly opens a page, searches
+the profiles or changes a dashboard control, pausing for a random think time in between. The report gives the
+throughput and the p50, p95 and p99 latency of each route and Dash callback.
+
+    python -m example_app.load_test --users 20 --duration 60
+
+By default the app is created with create_app and served on a free localhost port in this process, with its own
+temporary database; pass --url to test a server that is already running instead.
+"""
+import argparse
+import html
+import json
+import logging
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from http.cookiejar import CookieJar
+from pathlib import Path
+
+from example_app.config import DevelopmentConfig
+
+USERS = 10
+DURATION = 60
+# Mean seconds a user waits between requests, the waits are exponentially distributed
+THINK_TIME = 2.0
+PASSWORD = 'load-test-password'
+_CSRF_TOKEN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+_REGION_OPTION = re.compile(r'<option[^>]*value="(\d+)"')
+_NEXT_PAGE = re.compile(r'href="([^"]*[?&](?:amp;)?after=[^"]*)"')
+# Words the users' bios are made of and that they search for; every username contains 'load'
+SEARCH_WORDS = ['load', 'swimming', 'athletics', 'cycling', 'rowing', 'archery', 'fencing', 'judo', 'tennis', 'skiing',
+                'curling', 'coach', 'athlete', 'volunteer', 'fan']
+# Chance that a user who searched goes on to the next page of results, each time there is one
+NEXT_PAGE_PROBABILITY = 0.5
+
+# Dash callbacks a user triggers from the dashboard: (name, output, inputs)
+CALLBACKS = [
+    ('update_output_div', 'line-chart-time.figure',
+     [{'id': 'type-dropdown', 'property': 'value', 'value': ['EVENTS', 'SPORTS', 'COUNTRIES', 'PARTICIPANTS']}]),
+    ('update_leaderboard',
+     '..table-top-ten-gold-dash.columns...table-top-ten-gold-dash.data...leaderboard-heading.children..',
+     [{'id': 'leaderboard-medal-dropdown', 'property': 'value', 'value': ['Gold', 'Silver', 'Bronze', 'Total']},
+      {'id': 'leaderboard-n-input', 'property': 'value', 'value': [5, 10, 20]},
+      {'id': 'leaderboard-year-slider', 'property': 'value', 'value': [[1960, 2018], [1980, 2000], [2000, 2018]]},
+      {'id': 'leaderboard-type-checklist', 'property': 'value', 'value': [['Summer', 'Winter'], ['Summer']]}]),
+    ('update_map_style', 'scatter-mapbox-osm.figure',
+     [{'id': 'map-style-radio', 'property': 'value', 'value': ['OSM', 'USGS']}]),
+]
+# Relative frequency of each action a user takes after logging in; 'search' searches the profiles for a random word
+# and 'callback' changes a random dashboard control
+ACTIONS = {'/': 2, 'search': 2, '/dashboard/': 1, 'callback': 5}
+
+
+class LoadTestConfig(DevelopmentConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(Path(tempfile.gettempdir(), f'load_test_{uuid.uuid4().hex}.sqlite'))
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """ Reports redirects as responses, so that each request is timed on its own """
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class LatencyStats:
+    """ Latencies of the requests to each route, safe to add to from many threads. """
+
+    def __init__(self):
+        self._latencies = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, error=False):
+        with self._lock:
+            self._latencies.setdefault(route, []).append(seconds)
+            self._errors[route] = self._errors.get(route, 0) + error
+
+    def report(self, duration):
+        """
+        :param duration: seconds the test ran for
+        :return: dict of route to its request count, error count, requests per second and latency in milliseconds
+        """
+        with self._lock:
+            latencies = {route: sorted(values) for route, values in self._latencies.items()}
+            errors = dict(self._errors)
+        report = {}
+        for route, values in sorted(latencies.items()):
+            report[route] = {
+                'requests': len(values),
+                'errors': errors[route],
+                'per_second': len(values) / duration,
+                'mean_ms': statistics.fmean(values) * 1000,
+                'p50_ms': percentile(values, 50) * 1000,
+                'p95_ms': percentile(values, 95) * 1000,
+                'p99_ms': percentile(values, 99) * 1000,
+                'max_ms': values[-1] * 1000,
+            }
+        return report
+
+
+def percentile(sorted_values, percent):
+    """ :return: the nearest-rank percentile of a sorted list """
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class SimulatedUser:
+    """
+    One user with their own session cookie.
+
+    :param base_url: URL of the app e.g. 'http://127.0.0.1:5000'
+    :param stats: LatencyStats to record the requests in
+    :param think_time: mean seconds to wait between actions
+    :param seed: seed of the user's random choices
+    """
+
+    def __init__(self, base_url, stats, think_time=THINK_TIME, seed=None):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.think_time = think_time
+        self.random = random.Random(seed)
+        self.email = f'load-test-{uuid.uuid4().hex}@example.com'
+        self.last_body = b''
+        self._opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), _NoRedirect)
+
+    def run(self, deadline):
+        """ Signs up, logs in and creates a profile, then takes random actions until time.monotonic() is deadline """
+        self.sign_up()
+        if not self.log_in():
+            return
+        self.create_profile()
+        actions, weights = zip(*ACTIONS.items())
+        while time.monotonic() < deadline:
+            action = self.random.choices(actions, weights)[0]
+            if action == 'callback':
+                self.change_control()
+            elif action == 'search':
+                self.search()
+            elif action == '/dashboard/':
+                self.open_dashboard()
+            else:
+                self.request(action)
+            self.think(deadline)
+
+    def sign_up(self):
+        token = self._csrf_token('/signup')
+        return self.request('/signup', form={'csrf_token': token, 'first_name': 'Load', 'last_name': 'Test',
+                                             'email': self.email, 'password': PASSWORD,
+                                             'password_repeat': PASSWORD}) == 302
+
+    def log_in(self):
+        token = self._csrf_token('/login')
+        return self.request('/login', form={'csrf_token': token, 'email': self.email, 'password': PASSWORD}) == 302
+
+    def create_profile(self):
+        """ Creates the user's profile, with a bio of random SEARCH_WORDS, so that searches have profiles to find """
+        token = self._csrf_token('/create_profile')
+        regions = _REGION_OPTION.findall(self.last_body.decode('utf-8', 'replace'))
+        bio = ' '.join(self.random.choices(SEARCH_WORDS, k=5))
+        return self.request('/create_profile', form={'csrf_token': token, 'username': self.email.split('@')[0],
+                                                     'bio': bio, 'region_id': self.random.choice(regions or ['1'])})
+
+    def search(self):
+        """ Searches the profiles for a random word, then sometimes pages through the results with the Next link """
+        term = self.random.choice(SEARCH_WORDS)
+        self.request(f"/display_profiles?{urllib.parse.urlencode({'search_term': term})}",
+                     route='GET /display_profiles?search_term')
+        while self.random.random() < NEXT_PAGE_PROBABILITY:
+            match = _NEXT_PAGE.search(self.last_body.decode('utf-8', 'replace'))
+            if match is None:
+                break
+            self.request(html.unescape(match.group(1)), route='GET /display_profiles?after')
+
+    def open_dashboard(self):
+        """ Requests the dashboard page and then, as the Dash renderer does, its layout and callback list """
+        for path in ('/dashboard/', '/dashboard/_dash-layout', '/dashboard/_dash-dependencies'):
+            self.request(path)
+
+    def change_control(self):
+        name, output, inputs = self.random.choice(CALLBACKS)
+        values = [dict(component, value=self.random.choice(component['value'])) for component in inputs]
+        changed = self.random.choice(values)
+        body = {'output': output, 'outputs': _outputs(output), 'inputs': values,
+                'changedPropIds': [f"{changed['id']}.{changed['property']}"]}
+        self.request('/dashboard/_dash-update-component', json_body=body, route=f'callback {name}')
+
+    def request(self, path, form=None, json_body=None, route=None):
+        """
+        Makes a request and records its latency under route, which defaults to the method and path.
+
+        :return: int HTTP status, or 0 if there was no response
+        """
+        data, headers = None, {}
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode('utf-8')
+        elif json_body is not None:
+            data, headers = json.dumps(json_body).encode('utf-8'), {'Content-Type': 'application/json'}
+        method = 'GET' if data is None else 'POST'
+        route = route or f'{method} {path}'
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        start = time.perf_counter()
+        try:
+            with self._opener.open(request, timeout=60) as response:
+                self.last_body = response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            self.last_body = error.read()
+            status = error.code
+        except OSError:
+            self.last_body, status = b'', 0
+        self.stats.record(route, time.perf_counter() - start, error=not 200 <= status < 400)
+        return status
+
+    def think(self, deadline):
+        if self.think_time > 0:
+            time.sleep(max(0.0, min(self.random.expovariate(1 / self.think_time), deadline - time.monotonic())))
+
+    def _csrf_token(self, path):
+        self.request(path)
+        match = _CSRF_TOKEN.search(self.last_body.decode('utf-8', 'replace'))
+        return match.group(1) if match else ''
+
+
+def _outputs(output):
+    """ :return: the 'outputs' of a Dash callback request for its 'output' string """
+    if not output.startswith('..'):
+        component_id, prop = output.split('.', 1)
+        return {'id': component_id, 'property': prop}
+    return [dict(zip(('id', 'property'), item.split('.', 1))) for item in output.strip('.').split('...')]
+
+
+def serve_in_process(config_class=LoadTestConfig):
+    """
+    Creates the app and serves it, with a thread per request, on a free localhost port from a background thread.
+
+    :return: (str base URL, werkzeug server; call its shutdown method to stop it)
+    """
+    from werkzeug.serving import make_server
+    from example_app import create_app
+
+    app = create_app(config_class)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    # One log line per request would slow the test and bury the report
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def run_load_test(base_url, users=USERS, duration=DURATION, think_time=THINK_TIME, ramp_up=0.0, seed=0):
+    """
+    Runs the simulated users against an app for a number of seconds.
+
+    :param base_url: URL of the app
+    :param users: number of users at once
+    :param duration: seconds to run for once all users have started
+    :param think_time: mean seconds each user waits between actions, 0 for none
+    :param ramp_up: seconds over which the users are started
+    :param seed: seed of the users' random choices
+    :return: dict report with the settings and, per route, the statistics from LatencyStats.report
+    """
+    stats = LatencyStats()
+    start = time.monotonic()
+    deadline = start + ramp_up + duration
+    threads = []
+    for i in range(users):
+        user = SimulatedUser(base_url, stats, think_time, seed=seed * 100003 + i)
+        thread = threading.Thread(target=user.run, args=(deadline,), daemon=True)
+        threads.append(thread)
+        thread.start()
+        if ramp_up and i < users - 1:
+            time.sleep(ramp_up / (users - 1))
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    return {'url': base_url, 'users': users, 'duration': elapsed, 'think_time': think_time,
+            'routes': stats.report(elapsed)}
+
+
+def print_report(report, file=sys.stdout):
+    print(f"{report['users']} users for {report['duration']:.1f} s, think time {report['think_time']} s", file=file)
+    print(f"{'route':<44} {'requests':>8} {'errors':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}",
+          file=file)
+    for route, row in report['routes'].items():
+        print(f"{route:<44} {row['requests']:>8} {row['errors']:>6} {row['per_second']:>7.2f} {row['p50_ms']:>8.1f} "
+              f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the Flask app and dashboard.')
+    parser.add_argument('--url', help='URL of a running server, by default the app is served in this process')
+    parser.add_argument('--users', type=int, default=USERS)
+    parser.add_argument('--duration', type=float, default=DURATION, help='seconds')
+    parser.add_argument('--think-time', type=float, default=THINK_TIME, help='mean seconds between actions')
+    parser.add_argument('--ramp-up', type=float, default=0.0, help='seconds over which to start the users')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='JSON report file to write')
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        base_url, server = serve_in_process()
+    try:
+        report = run_load_test(base_url, args.users, args.duration, args.think_time, args.ramp_up, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+            Path(LoadTestConfig.SQLALCHEMY_DATABASE_URI[len('sqlite:///'):]).unlink(missing_ok=True)
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+""" The list of paralympic logos shown on the home page, kept in memory and rebuilt only when the logos change. """
+import os
+import threading
+from pathlib import Path
+
+LOGO_DIR = Path(__file__).parent.parent.joinpath('static', 'images', 'logos')
+
+
+class LogoManifest:
+    """
+    The logo files in a directory, named '<year>_<event>.<extension>' e.g. '1960_Rome.jpg', sorted by year.
+
+    The directory's modification time is checked on each call to logos, which changes when a file is added, removed
+    or renamed, and the list is rebuilt only then. Call invalidate to rebuild it on the next call regardless, e.g. from
+    a file watcher.
+
+    :param logo_dir: directory of logo files
+    """
+
+    def __init__(self, logo_dir=LOGO_DIR):
+        self.logo_dir = Path(logo_dir)
+        self._mtime_ns = None
+        self._logos = ()
+        self._lock = threading.Lock()
+
+    def logos(self):
+        """ :return: tuple of (filename, year, event) tuples, sorted by year; the same tuple until the logos change """
+        try:
+            mtime_ns = os.stat(self.logo_dir).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if mtime_ns != self._mtime_ns or mtime_ns is None:
+            with self._lock:
+                if mtime_ns != self._mtime_ns or mtime_ns is None:
+                    self._logos = self._scan()
+                    self._mtime_ns = mtime_ns
+        return self._logos
+
+    def invalidate(self):
+        with self._lock:
+            self._mtime_ns = None
+
+    def _scan(self):
+        try:
+            filenames = os.listdir(self.logo_dir)
+        except OSError:
+            return ()
+        logos = [(filename, filename[:4], os.path.splitext(filename)[0][5:]) for filename in filenames
+                 if not filename.startswith('.')]
+        return tuple(sorted(logos, key=lambda logo: (logo[1], logo[0])))
+
+
+logo_manifest = LogoManifest()
@@ -1,12 +1,12 @@
-import os
-import pandas as pd
-
 from flask import Blueprint, render_template, flash, redirect, url_for, request
 from flask_login import current_user, login_required
 
 from example_app import photos, db
 from example_app.main.forms import ProfileForm
-from example_app.models import Profile, Region
+from example_app.main.logos import logo_manifest
+from example_app.models import Profile
+from example_app.reference_data import region_choices
+from example_app.search import search_profiles
 from my_flask_app.models import User
 
 main_bp = Blueprint('main', __name__)
@@ -14,19 +14,10 @@ main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
 def index():
-    img_list = []
-    for filename in os.listdir('static/images/logos'):
-        img_list.append(filename)
-    img_df = pd.DataFrame(img_list, columns=['filename'])
-    img_df['year'] = img_df['filename'].str[:4]
-    img_df['event'] = img_df['filename'].str[5:-4]
     if not current_user.is_anonymous:
         name = current_user.first_name
         flash(f'Hello {name}. ')
-    img_df.sort_values(by=['year'], inplace=True)
-    img_df.reset_index(inplace=True, drop=True)
-    images = img_df.values.tolist()
-    return render_template('index.html', title='Home page', images=images)
+    return render_template('index.html', title='Home page', images=logo_manifest.logos())
 
 
 @main_bp.route('/profile', methods=['GET', 'POST'])
@@ -43,7 +34,7 @@ def profile():
 @login_required
 def create_profile():
     form = ProfileForm()
-    form.region_id.choices = [(r.id, r.region) for r in Region.query.order_by('region')]
+    form.region_id.choices = region_choices.choices()
     print(len(form.region_id.choices))
     if request.method == 'POST' and form.validate_on_submit():
         # Set the filename for the photo to None, this is the default if the user hasn't chosen to add a profile photo
@@ -66,7 +57,7 @@ def update_profile():
     profile = Profile.query.join(User, User.id == Profile.user_id).filter_by(id=current_user.id).first()
     # https://wtforms.readthedocs.io/en/3.0.x/fields/#wtforms.fields.SelectField fields with dynamic choice
     form = ProfileForm(obj=profile)
-    form.region_id.choices = [(r.id, r.region) for r in Region.query.order_by('region')]
+    form.region_id.choices = region_choices.choices()
     if request.method == 'POST' and form.validate_on_submit():
         if 'photo' in request.files:
             filename = photos.save(request.files['photo'])
@@ -83,22 +74,22 @@ def update_profile():
 @main_bp.route('/display_profiles/<username>/', methods=['POST', 'GET'])
 @login_required
 def display_profiles(username):
-    results = None
+    term = None
+    previous_page = next_page = None
     if username is None:
-        if request.method == 'POST':
-            term = request.form['search_term']
-            if term == "":
-                flash("Enter a name to search for")
-                return redirect(url_for("main.index"))
-            results = Profile.query.filter(Profile.username.contains(term)).all()
+        # The search form posts the term, the page links send it in the query string
+        term = request.values.get('search_term', '').strip()
+        if term == "":
+            flash("Enter a name to search for")
+            return redirect(url_for("main.index"))
+        results, previous_page, next_page = search_profiles(term, after=request.args.get('after'),
+                                                             before=request.args.get('before'))
     else:
-        results = Profile.query.filter_by(username=username).all()
+        # Usernames are unique, so there is at most one
+        results = Profile.query.filter_by(username=username).limit(1).all()
     if not results:
         flash("Username not found.")
         return redirect(url_for("main.index"))
-    urls = []
-    for result in results:
-        if result.photo:
-            url = photos.url(result.photo)
-            urls.append(url)
-    return render_template('display_profile.html', profiles=zip(results, urls))
+    profiles = [(result, photos.url(result.photo) if result.photo else None) for result in results]
+    return render_template('display_profile.html', profiles=profiles, search_term=term, previous_page=previous_page,
+                           next_page=next_page)
@@ -35,4 +35,4 @@ class Profile(db.Model):
 class Region(db.Model):
     __tablename__ = "region"
     id = db.Column(db.Integer, primary_key=True)
-    region = db.Column(db.Text)
+    region = db.Column(db.Text, unique=True)
@@ -0,0 +1,111 @@
+import functools
+import math
+import threading
+import time
+
+from dash.exceptions import PreventUpdate
+from flask import has_request_context, jsonify, request
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+
+class CallbackMetrics:
+    """
+    Counts and times the server callbacks of Dash apps, per callback output id.
+
+    For each callback it records the number of invocations, a histogram of their latency, the number that raised an
+    error, the number stopped with PreventUpdate and the size of the JSON responses. The latency covers running the
+    callback and serializing its response. For a background callback, only the request that starts its job is
+    recorded, not the requests the browser then makes to poll for its result.
+
+    :param buckets: sorted upper bounds, in seconds, of the latency histogram buckets; the last should be math.inf
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def instrument(self, dash_app):
+        """ Wraps every server callback registered so far on a Dash app so that its calls are recorded. """
+        for output_id, callback in dash_app.callback_map.items():
+            if 'callback' in callback and not getattr(callback['callback'], '_callback_metrics', False):
+                callback['callback'] = self._wrap(output_id, callback['callback'])
+
+    def record(self, output_id, seconds, payload_bytes=0, error=False, prevented=False):
+        """ Records one call of the callback for output_id. """
+        bucket = next(i for i, upper in enumerate(self.buckets) if seconds <= upper)
+        with self._lock:
+            metrics = self._metrics.get(output_id)
+            if metrics is None:
+                metrics = self._metrics[output_id] = {
+                    'count': 0,
+                    'errors': 0,
+                    'prevented': 0,
+                    'total_seconds': 0.0,
+                    'max_seconds': 0.0,
+                    'histogram': [0] * len(self.buckets),
+                    'payload_bytes': 0,
+                    'max_payload_bytes': 0,
+                }
+            metrics['count'] += 1
+            metrics['errors'] += error
+            metrics['prevented'] += prevented
+            metrics['total_seconds'] += seconds
+            metrics['max_seconds'] = max(metrics['max_seconds'], seconds)
+            metrics['histogram'][bucket] += 1
+            metrics['payload_bytes'] += payload_bytes
+            metrics['max_payload_bytes'] = max(metrics['max_payload_bytes'], payload_bytes)
+
+    def snapshot(self):
+        """
+        :return: dict of callback output id to its metrics; 'histogram' is a list of [upper bound, count] pairs, in
+        bucket order, counting the calls that took at most that long but longer than the bucket before
+        """
+        labels = ['inf' if math.isinf(upper) else upper for upper in self.buckets]
+        with self._lock:
+            snapshot = {}
+            for output_id, metrics in self._metrics.items():
+                snapshot[output_id] = dict(metrics, histogram=[list(pair) for pair in zip(labels, metrics['histogram'])])
+                snapshot[output_id]['mean_seconds'] = metrics['total_seconds'] / metrics['count']
+            return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def _wrap(self, output_id, func):
+        @functools.wraps(func)
+        def timed_callback(*args, **kwargs):
+            if has_request_context() and request.args.get('cacheKey'):
+                # Dash polling for the result of a background callback's job
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                response = func(*args, **kwargs)
+            except PreventUpdate:
+                self.record(output_id, time.perf_counter() - start, prevented=True)
+                raise
+            except Exception:
+                self.record(output_id, time.perf_counter() - start, error=True)
+                raise
+            seconds = time.perf_counter() - start
+            payload = response.encode('utf-8') if isinstance(response, str) else response
+            self.record(output_id, seconds, len(payload) if payload else 0)
+            return response
+
+        timed_callback._callback_metrics = True
+        return timed_callback
+
+
+callback_metrics = CallbackMetrics()
+
+
+def register_metrics_view(dash_app, metrics=callback_metrics):
+    """
+    Adds a route, under the Dash app's path, that returns the callback metrics as JSON. Call this before the Dash
+    views are protected with Flask-Login so that it is protected with them.
+    """
+    rule = dash_app.config.routes_pathname_prefix + '_callback-metrics'
+    dash_app.server.add_url_rule(rule, endpoint=rule, view_func=lambda: jsonify(metrics.snapshot()))
@@ -1,12 +1,55 @@
+import inspect
 import json
 
 from dash import Output, Input
+from dash.exceptions import PreventUpdate
 
 import paralympic_app.create_charts as cc
+from example_app.paralympic_app import layout
+from example_app.paralympic_app.callback_metrics import callback_metrics
+
+
+# Callbacks that only map their input values to output values, without needing any server data, as
+# (JavaScript function, outputs, inputs). They run in the browser so they do not make a request to the server.
+CLIENTSIDE_CALLBACKS = [
+    (
+        # Display or hide the winter and summer male:female ratio bar charts depending on the checkbox values
+        """
+        function(selected_types) {
+            return [
+                {'display': selected_types.includes('Winter') ? 'block' : 'none'},
+                {'display': selected_types.includes('Summer') ? 'block' : 'none'}
+            ];
+        }
+        """,
+        [Output("stacked-bar-gender-win", "style"),
+         Output("stacked-bar-gender-sum", "style")],
+        Input("mf-ratio-checklist", "value"),
+    ),
+]
+
+# Shows the highlights text for the map point being hovered over, when the map was built with include_highlights
+INLINE_HIGHLIGHTS_CALLBACK = (
+    """
+    function(hoverData) {
+        if (!hoverData) {
+            return window.dash_clientside.no_update;
+        }
+        const highlights = hoverData.points[0].customdata[%d];
+        return highlights || %s;
+    }
+    """ % (cc.MAP_CUSTOMDATA_HIGHLIGHTS, json.dumps(cc.NO_HIGHLIGHTS_TEXT)),
+    Output('highlight-text', 'children'),
+    Input('scatter-mapbox-osm', 'hoverData'),
+)
 
 
 def register_callbacks(dash_app):
-    """ Create the callbacks for a Plotly Dash dash_app. """
+    """
+    Create the callbacks for a Plotly Dash dash_app.
+    """
+    for function, outputs, inputs in CLIENTSIDE_CALLBACKS:
+        dash_app.clientside_callback(function, outputs, inputs)
 
     @dash_app.callback(
         Output(component_id='line-chart-time', component_property='figure'),
@@ -18,45 +61,101 @@ def register_callbacks(dash_app):
 
         :param event_variable: one of the following which are columns in the paralympics dataset ['EVENTS', 'SPORTS',
         'COUNTRIES', 'PARTICIPANTS']
-        :return: plotly.px.Figure The line chart representing the chosen variable
+        :return: dict The line chart figure representing the chosen variable
         """
-        fig_line_time = cc.line_chart_over_time(event_variable)
+        fig_line_time = cc.figure_cache.get(cc.line_chart_over_time, event_variable)
         return fig_line_time
 
+    if cc.highlights_inline():
+        # The map figure carries the highlights text so the browser can show it without asking the server
+        dash_app.clientside_callback(*INLINE_HIGHLIGHTS_CALLBACK)
+    else:
+        @dash_app.callback(
+            Output('highlight-text', 'children'),
+            Input('scatter-mapbox-osm', 'hoverData'))
+        def display_hover_data(hoverData):
+            """
+            Callback to find the highlight text for a given paralympic event when it is hovered over on the map.
+
+            :param hoverData: he `hoverData` from the Input
+            :return: text for the paragraph with id='highlight-text'
+            """
+            if hoverData is None:
+                raise PreventUpdate
+            location = json.dumps(hoverData['points'][0]['customdata'][2], indent=2)
+            location = location.strip('"')
+            year = json.dumps(hoverData['points'][0]['customdata'][3], indent=2)
+            year = int(year)
+            highlight_text = cc.get_event_highlights(location, year)
+            return highlight_text
+
     @dash_app.callback(
-        [Output("stacked-bar-gender-win", "style"),
-         Output("stacked-bar-gender-sum", "style")],
-        Input("mf-ratio-checklist", "value"),
-    )
-    def show_hide_ratio_charts(selected_types):
+        [Output('table-top-ten-gold-dash', 'columns'),
+         Output('table-top-ten-gold-dash', 'data'),
+         Output('leaderboard-heading', 'children')],
+        [Input('leaderboard-medal-dropdown', 'value'),
+         Input('leaderboard-n-input', 'value'),
+         Input('leaderboard-year-slider', 'value'),
+         Input('leaderboard-type-checklist', 'value')])
+    def update_leaderboard(medal, n, years, selected_types):
         """
-        Callback to display or hide the winter and summer male:female ratio bar charts depending on the checkbox values.
+        Callback to update the medal leaderboard table when any of its controls are changed.
 
+        :param medal: 'Gold', 'Silver', 'Bronze' or 'Total'
+        :param n: number of countries to show, None while the input holds an invalid number
+        :param years: [first year, last year] from the range slider
         :param selected_types: List of checkbox values for the event type(s) (Winter and/or Summer)
-        :return: a list of values, the first sets visibility for the Winter chart, the second for the Summer
+        :return: the table columns, the table data and the heading text
         """
-        # Default to hiding both
-        win_show = {'display': 'none'}
-        sum_show = {'display': 'none'}
-        if 'Winter' in selected_types:
-            win_show = {'display': 'block'}
-        if 'Summer' in selected_types:
-            sum_show = {'display': 'block'}
-        return [win_show, sum_show]
+        if n is None:
+            raise PreventUpdate
+        start_year, end_year = years
+        if len(selected_types) == 1:
+            event_type = selected_types[0]
+        else:
+            event_type = None
+        df = cc.top_medals_data(medal, n, start_year, end_year, event_type)
+        if not selected_types:
+            df = df.iloc[0:0]
+        medal_text = 'medals' if medal == 'Total' else f'{medal.lower()} medals'
+        heading = f"Which countries have won the most {medal_text} between {start_year} and {end_year}?"
+        columns = [{"name": i, "id": i} for i in df.columns]
+        return columns, df.to_dict('records'), heading
 
     @dash_app.callback(
-        Output('highlight-text', 'children'),
-        Input('scatter-mapbox-osm', 'hoverData'))
-    def display_hover_data(hoverData):
+        Output('scatter-mapbox-osm', 'figure'),
+        Input('map-style-radio', 'value'),
+        running=[(Output('map-status', 'children'), 'Loading map...', '')],
+        prevent_initial_call=True)
+    def update_map_style(mapbox_type):
         """
-        Callback to find the highlight text for a given paralympic event when it is hovered over on the map.
+        Callback to rebuild the map of the paralympic locations when a different map style is chosen. The figure cache
+        builds each map style once, in the figure render pool's worker processes if FIGURE_RENDER_PROCESSES is set, so
+        building it does not hold the GIL of the process serving requests.
 
-        :param hoverData: he `hoverData` from the Input
-        :return: text for the paragraph with id='highlight-text'
+        :param mapbox_type: 'OSM' or 'USGS'
+        :return: dict the map figure
         """
-        location = json.dumps(hoverData['points'][0]['customdata'][2], indent=2)
-        location = location.strip('"')
-        year = json.dumps(hoverData['points'][0]['customdata'][3], indent=2)
-        year = int(year)
-        highlight_text = cc.get_event_highlights(location, year)
-        return highlight_text
+        builder = cc.scatter_mapbox_para_locations
+        return cc.figure_cache.get(builder, *layout.figure_args(builder, mapbox_type, True))
+
+    # Time and count every server callback registered above
+    callback_metrics.instrument(dash_app)
+
+
+def find_pure_callbacks(dash_app):
+    """
+    Finds the server callbacks that could be moved to CLIENTSIDE_CALLBACKS: those whose function uses nothing but its
+    arguments and builtins, i.e. no modules, data or other functions from the server.
+
+    :return: list of the callbacks' output ids
+    """
+    pure = []
+    for output_id, callback in dash_app.callback_map.items():
+        if 'callback' not in callback:
+            continue
+        func = inspect.unwrap(callback['callback'])
+        closure_vars = inspect.getclosurevars(func)
+        if not closure_vars.globals and not closure_vars.nonlocals:
+            pure.append(output_id)
+    return pure
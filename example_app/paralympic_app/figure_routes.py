@@ -0,0 +1,23 @@
+from flask import Blueprint, Response, abort, request
+from flask_login import login_required
+
+import paralympic_app.create_charts as cc
+
+figures_bp = Blueprint('figures', __name__, url_prefix='/dashboard/figures')
+
+
+@figures_bp.route('/<name>.json')
+@login_required
+def figure_artifact(name):
+    """
+    Serves a prebuilt dashboard figure, see paralympic_app/figure_artifacts.py. The artifact's content hash is sent as
+    its ETag so browsers and proxies can revalidate with If-None-Match and get a 304 instead of the figure.
+    """
+    fig_json = cc.figure_artifacts.get_json_by_name(name)
+    if fig_json is None:
+        abort(404)
+    response = Response(fig_json, mimetype='application/json')
+    response.set_etag(cc.figure_artifacts.etag(name))
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
@@ -1,96 +1,217 @@
+import threading
+import time
+
 from dash import html
 from dash import dcc
 from dash import dash_table
 import dash_bootstrap_components as dbc
+from flask import current_app, has_app_context, has_request_context, request
 import paralympic_app.create_charts as cc
 
-fig_line_time = cc.line_chart_over_time('EVENTS')
-fig_sb_gender_winter = cc.stacked_bar_gender("Winter")
-fig_sb_gender_summer = cc.stacked_bar_gender("Summer")
-fig_scatter_mapbox_OSM = cc.scatter_mapbox_para_locations("OSM")
-fig_scatter_mapbox_USGS = cc.scatter_mapbox_para_locations("USGS")
-df_medals_data = cc.top_ten_gold_data()
-fig_top_ten_gold = cc.table_top_ten_gold_table(df_medals_data)
-df_medals = cc.get_medals_table_data('London', 2012)
-
-layout = dbc.Container(children=[
-    html.H1("Paralympic History"),
-    html.H2("Has the number of athletes, nations, events and sports changed over time?"),
-
-    dbc.Row([
-        dbc.Col(width=2, children=[
-            dcc.Dropdown(
-                id='type-dropdown',
-                options=[
-                    {'label': 'Events', 'value': 'EVENTS'},
-                    {'label': 'Sports', 'value': 'SPORTS'},
-                    {'label': 'Countries', 'value': 'COUNTRIES'},
-                    {'label': 'Athletes', 'value': 'PARTICIPANTS'},
-                ],
-                value='EVENTS'
-            ),
-        ]),
-        dbc.Col(width=10, children=[
-            dcc.Graph(
-                id='line-chart-time',
-                figure=fig_line_time
-            ),
+# The figures in the layout, built when the layout is first served rather than when this module is imported
+LAYOUT_FIGURES = {
+    'stacked-bar-gender-win': (cc.stacked_bar_gender, 'Winter'),
+    'stacked-bar-gender-sum': (cc.stacked_bar_gender, 'Summer'),
+    'scatter-mapbox-osm': (cc.scatter_mapbox_para_locations, 'OSM', True),
+}
+# Components whose content is only ever set by a callback, which Dash runs when the page first loads
+CALLBACK_FILLED = ('line-chart-time', 'table-top-ten-gold-dash')
+
+_validation_layout = None
+_layout_lock = threading.Lock()
+_build_seconds = {}
+
+
+def layout():
+    """
+    The Dash layout. Pass the function itself, not its result, to `Dash.layout`: it builds the layout and its figures
+    the first time the dashboard is requested and returns the same layout after that. The layout is kept per Flask app,
+    as its map figure depends on the app's tile proxy.
+    """
+    # Dash also calls this on the first request to any page of the Flask app, but only to check the component ids
+    if not has_request_context() or not request.path.endswith('/_dash-layout'):
+        return validation_layout()
+    extensions = current_app.extensions
+    if 'dashboard_layout' not in extensions:
+        with _layout_lock:
+            if 'dashboard_layout' not in extensions:
+                extensions['dashboard_layout'] = _build_layout(_build_figure, cc.leaderboard_years())
+    return extensions['dashboard_layout']
+
+
+def validation_layout():
+    """
+    The layout's components without any of their figures or data, for `Dash.validation_layout`. Setting this stops
+    Dash calling `layout()` to validate the callbacks when the app is created.
+    """
+    global _validation_layout
+    if _validation_layout is None:
+        _validation_layout = _build_layout(lambda component_id: {}, [0])
+    return _validation_layout
+
+
+def startup_report():
+    """
+    Reports which of the layout's figures have been built so far and how long each took.
+
+    :return: dict of component id to a dict with 'status' of 'deferred', 'built' or 'callback' and, once built,
+    'seconds'
+    """
+    report = {component_id: {'status': 'callback'} for component_id in CALLBACK_FILLED}
+    for component_id in LAYOUT_FIGURES:
+        if component_id in _build_seconds:
+            report[component_id] = {'status': 'built', 'seconds': _build_seconds[component_id]}
+        else:
+            report[component_id] = {'status': 'deferred'}
+    return report
+
+
+def figure_args(builder, *args):
+    """
+    :return: tuple of the arguments to build a figure with, which for the map are followed by the app's TILE_PROXY_URL
+    if it has one
+    """
+    proxy_url = current_app.config.get('TILE_PROXY_URL') if has_app_context() else None
+    if builder is cc.scatter_mapbox_para_locations and proxy_url:
+        return (*args, proxy_url)
+    return args
+
+
+def _build_figure(component_id):
+    builder, *args = LAYOUT_FIGURES[component_id]
+    start = time.perf_counter()
+    fig = cc.figure_cache.get(builder, *figure_args(builder, *args))
+    _build_seconds.setdefault(component_id, time.perf_counter() - start)
+    return fig
+
+
+def _build_layout(figure, leaderboard_years):
+    """
+    :param figure: function that takes a component id and returns the figure for it
+    :param leaderboard_years: sorted list of the years for the leaderboard year range slider
+    :return: the layout
+    """
+    return dbc.Container(children=[
+        html.H1("Paralympic History"),
+        html.H2("Has the number of athletes, nations, events and sports changed over time?"),
+
+        dbc.Row([
+            dbc.Col(width=2, children=[
+                dcc.Dropdown(
+                    id='type-dropdown',
+                    options=[
+                        {'label': 'Events', 'value': 'EVENTS'},
+                        {'label': 'Sports', 'value': 'SPORTS'},
+                        {'label': 'Countries', 'value': 'COUNTRIES'},
+                        {'label': 'Athletes', 'value': 'PARTICIPANTS'},
+                    ],
+                    value='EVENTS'
+                ),
+            ]),
+            dbc.Col(width=10, children=[
+                dcc.Graph(
+                    id='line-chart-time'
+                ),
+            ]),
         ]),
-    ]),
-    html.H2("Has the ratio of male and female athletes changed over time?"),
-    dbc.Row([
-        dbc.Col(width=2, children=[
-            dcc.Checklist(
-                id='mf-ratio-checklist',
-                options=[
-                    {'label': 'Winter', 'value': 'Winter'},
-                    {'label': 'Summer', 'value': 'Summer'}
-                ],
-                value=['Winter', 'Summer'],
-                labelStyle={"display": "inline-block"},
-            ),
+        html.H2("Has the ratio of male and female athletes changed over time?"),
+        dbc.Row([
+            dbc.Col(width=2, children=[
+                dcc.Checklist(
+                    id='mf-ratio-checklist',
+                    options=[
+                        {'label': 'Winter', 'value': 'Winter'},
+                        {'label': 'Summer', 'value': 'Summer'}
+                    ],
+                    value=['Winter', 'Summer'],
+                    labelStyle={"display": "inline-block"},
+                ),
+            ]),
+            dbc.Col(width=10, children=[
+                html.Div([
+                    dcc.Graph(
+                        id='stacked-bar-gender-win',
+                        figure=figure('stacked-bar-gender-win')
+                    )
+                ], style={'display': 'block'}),
+                html.Div([
+                    dcc.Graph(
+                        id='stacked-bar-gender-sum',
+                        figure=figure('stacked-bar-gender-sum')
+                    )
+                ], style={'display': 'block'}),
+            ]),
         ]),
-        dbc.Col(width=10, children=[
-            html.Div([
-                dcc.Graph(
-                    id='stacked-bar-gender-win',
-                    figure=fig_sb_gender_winter
-                )
-            ], style={'display': 'block'}),
-            html.Div([
+
+        html.H2("Where in the world have the Paralympics been held?"),
+        dbc.Row([
+            dbc.Col(width=2, children=[
+                dcc.RadioItems(
+                    id='map-style-radio',
+                    options=[
+                        {'label': 'Street map', 'value': 'OSM'},
+                        {'label': 'Satellite', 'value': 'USGS'}
+                    ],
+                    value='OSM',
+                    labelStyle={"display": "inline-block"},
+                ),
+                html.P(id='map-status'),
+                html.H3('Event highlights'),
+                html.P('Hover on the points in the map to see the event highlights', id='highlight-text')
+            ]),
+            dbc.Col(width=10, children=[
                 dcc.Graph(
-                    id='stacked-bar-gender-sum',
-                    figure=fig_sb_gender_summer
-                )
-            ], style={'display': 'block'}),
+                    id='scatter-mapbox-osm',
+                    figure=figure('scatter-mapbox-osm')
+                ),
+            ]),
         ]),
-    ]),
 
-    html.H2("Where in the world have the Paralympics been held?"),
-    dbc.Row([
-        dbc.Col(width=2, children=[
-            html.H3('Event highlights'),
-            html.P('Hover on the points in the map to see the event highlights', id='highlight-text')
+        html.H2("Which countries have won the most gold medals since 1960?", id='leaderboard-heading'),
+        dbc.Row([
+            dbc.Col(width=2, children=[
+                html.Label('Medal', htmlFor='leaderboard-medal-dropdown'),
+                dcc.Dropdown(
+                    id='leaderboard-medal-dropdown',
+                    options=[
+                        {'label': 'Gold', 'value': 'Gold'},
+                        {'label': 'Silver', 'value': 'Silver'},
+                        {'label': 'Bronze', 'value': 'Bronze'},
+                        {'label': 'All medals', 'value': 'Total'},
+                    ],
+                    value='Gold',
+                    clearable=False
+                ),
+                html.Label('Number of countries', htmlFor='leaderboard-n-input'),
+                dcc.Input(id='leaderboard-n-input', type='number', min=1, max=50, step=1, value=10),
+                dcc.Checklist(
+                    id='leaderboard-type-checklist',
+                    options=[
+                        {'label': 'Winter', 'value': 'Winter'},
+                        {'label': 'Summer', 'value': 'Summer'}
+                    ],
+                    value=['Winter', 'Summer'],
+                    labelStyle={"display": "inline-block"},
+                ),
+            ]),
+            dbc.Col(width=10, children=[
+                dcc.RangeSlider(
+                    id='leaderboard-year-slider',
+                    min=leaderboard_years[0],
+                    max=leaderboard_years[-1],
+                    step=None,
+                    marks={year: str(year) for year in leaderboard_years},
+                    value=[leaderboard_years[0], leaderboard_years[-1]]
+                ),
+                dash_table.DataTable(
+                    id='table-top-ten-gold-dash',
+                    style_cell=dict(textAlign='left'),
+                    style_header=dict(backgroundColor="lightskyblue"),
+                    style_data=dict(backgroundColor="white")
+                ),
+            ]),
         ]),
-        dbc.Col(width=10, children=[
-            dcc.Graph(
-                id='scatter-mapbox-osm',
-                figure=fig_scatter_mapbox_OSM
-            ),
-        ]),
-    ]),
-
-    html.H2("Which countries have won the most gold medals since 1960?"),
-    dash_table.DataTable(
-        id='table-top-ten-gold-dash',
-        columns=[{"name": i, "id": i}
-                 for i in df_medals_data.columns],
-        data=df_medals_data.to_dict('records'),
-        style_cell=dict(textAlign='left'),
-        style_header=dict(backgroundColor="lightskyblue"),
-        style_data=dict(backgroundColor="white")
-    ),
-
-],
-    fluid=True,
-)
+
+    ],
+        fluid=True,
+    )
@@ -0,0 +1,22 @@
+from flask import Blueprint, Response, abort, current_app
+from flask_login import login_required
+
+from paralympic_app.map_tiles import tile_mimetype
+
+tiles_bp = Blueprint('tiles', __name__, url_prefix='/dashboard/tiles')
+
+
+@tiles_bp.route('/<source>/<int:z>/<int:x>/<int:y>')
+@login_required
+def tile(source, z, x, y):
+    """
+    Serves a map tile from the app's TileCache, see paralympic_app/map_tiles.py. Tiles do not change, so browsers may
+    keep them for a day.
+    """
+    data = current_app.extensions['tile_cache'].get(source, z, x, y)
+    if data is None:
+        abort(404)
+    response = Response(data, mimetype=tile_mimetype(data))
+    response.cache_control.private = True
+    response.cache_control.max_age = 24 * 60 * 60
+    return response
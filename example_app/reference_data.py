@@ -0,0 +1,46 @@
+""" Reference data that rarely changes, loaded from the database once per process and shared between requests. """
+import threading
+
+from example_app import db
+from example_app.seed import REGIONS_SEED
+from seeding import applied_version
+
+
+class RegionChoices:
+    """
+    The (id, region) choices of the profile form's region select field, sorted by region name.
+
+    The region table is only written by the regions seed, so the choices are read from the database the first time
+    they are needed and kept until the seed is applied again. The seed may be applied by another process, e.g. the
+    seed CLI while the app's workers are running, so each read looks up the seed's checksum row, which is one primary
+    key lookup, and reloads the choices when it has changed. version is the (sha256, applied_at) of the seed the choices
+    were loaded after, e.g. for use in a cache key. The choices are a tuple so that every form can use the same one
+    without copying it.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._choices = None
+        self._lock = threading.Lock()
+
+    def choices(self):
+        """ :return: tuple of (int id, str region) tuples; needs an app context """
+        version = applied_version(db.session, REGIONS_SEED)
+        choices = self._choices
+        if choices is None or version != self.version:
+            with self._lock:
+                if self._choices is None or version != self.version:
+                    from example_app.models import Region
+                    rows = db.session.query(Region.id, Region.region).order_by(Region.region)
+                    self._choices = tuple((region_id, region) for region_id, region in rows)
+                    self.version = version
+                choices = self._choices
+        return choices
+
+    def invalidate(self):
+        """ Reloads the choices when next used, call after the region table is rewritten by this process """
+        with self._lock:
+            self._choices = None
+
+
+region_choices = RegionChoices()
@@ -0,0 +1,170 @@
+""" Full-text search of the profiles, using an SQLite FTS5 index of their usernames and bios.
+
+The index is an external content FTS5 table, profile_fts, that stores only the index and reads the text from the
+profile table. Triggers on the profile table update it whenever a profile is created, updated or deleted, so it is
+always in step with the table however the profile was written.
+
+Matches are ranked in relevance buckets that only depend on each profile's own text: profiles whose username matches
+every word come first, then those that match in the bio, and within a bucket they are in id order. A score such as
+bm25 is not used as the sort key because it depends on statistics of the whole index, so writing any profile between
+two page requests would reorder the others and some matches would be skipped or shown twice.
+"""
+import re
+
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from example_app import db
+
+PER_PAGE = 10
+MAX_PER_PAGE = 50
+# FTS5 queries of the relevance buckets, best first, for the query of match_query: matches in the username, then the
+# rest, i.e. matches that need the bio
+RELEVANCE_BUCKETS = ['{{username}} : ({query})', '({query}) NOT {{username}} : ({query})']
+_WORD = re.compile(r'\w+')
+
+_CREATE_INDEX = [
+    # Prefix indexes make prefix queries of 2 and 3 characters as fast as whole words
+    """CREATE VIRTUAL TABLE profile_fts USING fts5(username, bio, content='profile', content_rowid='id',
+           tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS profile_fts_insert AFTER INSERT ON profile BEGIN
+           INSERT INTO profile_fts(rowid, username, bio) VALUES (new.id, new.username, new.bio);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS profile_fts_delete AFTER DELETE ON profile BEGIN
+           INSERT INTO profile_fts(profile_fts, rowid, username, bio) VALUES ('delete', old.id, old.username, old.bio);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS profile_fts_update AFTER UPDATE OF username, bio ON profile BEGIN
+           INSERT INTO profile_fts(profile_fts, rowid, username, bio) VALUES ('delete', old.id, old.username, old.bio);
+           INSERT INTO profile_fts(rowid, username, bio) VALUES (new.id, new.username, new.bio);
+       END""",
+    # Indexes the profiles created before the index was
+    "INSERT INTO profile_fts(profile_fts) VALUES ('rebuild')",
+]
+
+
+def init_profile_search(app):
+    """
+    Creates the profile search index and its triggers if the database does not have them yet. Call after the profile
+    table is created. Without FTS5 in the SQLite library, search falls back to a LIKE query that scans the table.
+
+    :return: bool whether full-text search is available
+    """
+    with app.app_context():
+        try:
+            with db.engine.begin() as connection:
+                exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'profile_fts'")).first()
+                if not exists:
+                    for statement in _CREATE_INDEX:
+                        connection.execute(text(statement))
+            available = True
+        except OperationalError:
+            available = False
+    app.extensions['profile_search'] = available
+    return available
+
+
+def match_query(term):
+    """
+    Turns what a user typed into an FTS5 query that matches profiles containing every word, the last one as a prefix
+    so that results appear while a word is being typed. Words are quoted, so FTS5 operators are searched for as text.
+
+    :return: str FTS5 query, or None if the term has no words
+    """
+    words = _WORD.findall(term)
+    if not words:
+        return None
+    return ' '.join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+
+
+def search_profiles(term, after=None, before=None, per_page=PER_PAGE):
+    """
+    Searches the profiles' usernames and bios, username matches first, see RELEVANCE_BUCKETS.
+
+    Results are paged with cursors rather than offsets: a page starts after, or ends before, the (bucket, id) of a
+    result. Neither changes when other profiles are written, so paging never skips or repeats a match; profiles added
+    meanwhile appear at the end of their bucket. FTS5 reads the matches in id order, so a page only reads the matches
+    it returns, however many profiles match. A profile whose own username is changed may move to the other bucket.
+
+    :param term: str words to search for
+    :param after: cursor of the last result of the previous page, to get the page after it
+    :param before: cursor of the first result of the following page, to get the page before it
+    :param per_page: results per page, at most MAX_PER_PAGE
+    :return: (list of Profile on the page, cursor for the page before it or None, cursor for the page after it or None)
+    """
+    from example_app.models import Profile
+
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    backwards = before is not None
+    key = parse_cursor(before if backwards else after)
+    if current_app.extensions.get('profile_search'):
+        query = match_query(term)
+        if query is None:
+            return [], None, None
+        keys = _ranked_matches(query, key, backwards, per_page + 1)
+    else:
+        keys = _like_matches(term, key, backwards, per_page + 1)
+    # One more than a page is fetched to tell whether there is another page, without counting every match
+    more = len(keys) > per_page
+    keys = keys[:per_page]
+    if not keys:
+        return [], None, None
+    if backwards:
+        keys.reverse()
+    first, last = make_cursor(*keys[0]), make_cursor(*keys[-1])
+    if backwards:
+        previous_page, next_page = first if more else None, last
+    else:
+        previous_page, next_page = first if key else None, last if more else None
+    ids = [profile_id for bucket, profile_id in keys]
+    profiles = {profile.id: profile for profile in Profile.query.filter(Profile.id.in_(ids))}
+    return [profiles[profile_id] for profile_id in ids if profile_id in profiles], previous_page, next_page
+
+
+def make_cursor(bucket, profile_id):
+    """ :return: str cursor of a result, see search_profiles """
+    return f'{bucket}_{profile_id}'
+
+
+def parse_cursor(cursor):
+    """ :return: (int bucket, int id) of a cursor from make_cursor, or None if there is none or it is not valid """
+    try:
+        bucket, profile_id = (int(part) for part in cursor.split('_'))
+    except (AttributeError, ValueError):
+        return None
+    return (bucket, profile_id) if 0 <= bucket < len(RELEVANCE_BUCKETS) else None
+
+
+def _ranked_matches(query, key, backwards, limit):
+    """ :return: list of (bucket, id) of the matches of an FTS5 query after, or before, key in rank order """
+    if key is None:
+        first = len(RELEVANCE_BUCKETS) - 1 if backwards else 0
+    else:
+        first = key[0]
+    buckets = range(first, -1, -1) if backwards else range(first, len(RELEVANCE_BUCKETS))
+    keys = []
+    for bucket in buckets:
+        keyset = ''
+        if key is not None and bucket == key[0]:
+            keyset = 'AND rowid < :id' if backwards else 'AND rowid > :id'
+        # FTS5 reads its index in rowid order, so with the LIMIT it stops once it has found enough matches
+        rows = db.session.execute(
+            text(f'SELECT rowid FROM profile_fts WHERE profile_fts MATCH :query {keyset} '
+                 f'ORDER BY rowid {"DESC" if backwards else ""} LIMIT :limit'),
+            {'query': RELEVANCE_BUCKETS[bucket].format(query=query), 'id': key[1] if key else None,
+             'limit': limit - len(keys)})
+        keys += [(bucket, profile_id) for profile_id, in rows]
+        if len(keys) >= limit:
+            break
+    return keys
+
+
+def _like_matches(term, key, backwards, limit):
+    """ :return: list of (0, id) of the profiles whose username contains term, after, or before, key in id order """
+    from example_app.models import Profile
+
+    query = db.session.query(Profile.id).filter(Profile.username.contains(term))
+    if key is not None:
+        query = query.filter(Profile.id < key[1] if backwards else Profile.id > key[1])
+    query = query.order_by(Profile.id.desc() if backwards else Profile.id)
+    return [(0, profile_id) for profile_id, in query.limit(limit)]
@@ -0,0 +1,56 @@
+""" Seeds the reference data tables of the example_app database, see seeding/__init__.py.
+
+create_app seeds the database when SEED_ON_STARTUP is set. When several workers share a database, turn it off and
+seed once before starting them with:
+
+    python -m example_app.seed [--config example_app.config.ProductionConfig] [--force]
+"""
+from pathlib import Path
+
+from example_app import db
+from seeding import Seed, read_csv, seed_cli, seed_table
+
+NOC_REGIONS_FILEPATH = Path(__file__).parent.joinpath('paralympic_app', 'data', 'noc_regions.csv')
+REGIONS_SEED = 'noc_regions'
+
+
+def read_regions(filepath=NOC_REGIONS_FILEPATH):
+    """ :return: list of {'region': name} of the distinct regions in the noc_regions file, in the order they appear """
+    regions = dict.fromkeys(row['region'] for row in read_csv(filepath) if row['region'] is not None)
+    return [{'region': region} for region in regions]
+
+
+def regions_in_use():
+    """ :return: set of the names of the regions profiles refer to, which are kept when they leave the file """
+    from example_app.models import Profile, Region
+    return {region for region, in db.session.query(Region.region).join(Profile, Profile.region_id == Region.id)}
+
+
+def seed_regions(filepath=NOC_REGIONS_FILEPATH, force=False):
+    """
+    Brings the region table up to date with the noc_regions file, keyed on the region name. New regions get the next
+    free ids and regions no longer in the file are removed unless a profile refers to them.
+
+    :return: dict with the seed name, whether it was skipped and the numbers of regions upserted and deleted
+    """
+    from example_app.models import Region
+    from example_app.reference_data import region_choices
+
+    seed = Seed(REGIONS_SEED, filepath, Region.__table__, 'region', read_regions, keep=regions_in_use)
+    result = seed_table(db.session, seed, force)
+    if not result['skipped']:
+        region_choices.invalidate()
+    return result
+
+
+def seed_all(force=False):
+    """ Applies every seed, call from within an app context; :return: list of the result dict of each seed """
+    return [seed_regions(force=force)]
+
+
+def _import_models():
+    import example_app.models  # noqa: F401
+
+
+if __name__ == '__main__':
+    seed_cli(db, _import_models, seed_all, 'example_app.config.DevelopmentConfig')
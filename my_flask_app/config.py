@@ -16,6 +16,8 @@ class Config(object):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(pathlib.Path(__file__).parent.joinpath('my_example.sqlite'))
     TESTING = False
+    # Seed the reference data tables when the app starts, see seed.py; turn off when several workers share a database
+    SEED_ON_STARTUP = True
 
 
 class ProductionConfig(Config):
@@ -0,0 +1,41 @@
+""" Seeds the reference data tables of the my_flask_app database, see seeding/__init__.py.
+
+create_app seeds the database when SEED_ON_STARTUP is set. When several workers share a database, turn it off and
+seed once before starting them with:
+
+    python -m my_flask_app.seed [--config my_flask_app.config.ProductionConfig] [--force]
+"""
+from pathlib import Path
+
+from my_flask_app import db
+from seeding import Seed, read_csv, seed_cli, seed_table
+
+NOC_REGIONS_FILEPATH = Path(__file__).parent.parent.joinpath('paralympic_app', 'data', 'noc_regions.csv')
+
+
+def read_noc_regions(filepath=NOC_REGIONS_FILEPATH):
+    """ :return: list of {'noc': code, 'region': name or None}, one per NOC code in the noc_regions file """
+    return [{'noc': row['NOC'], 'region': row['region']} for row in read_csv(filepath)]
+
+
+def seed_regions(filepath=NOC_REGIONS_FILEPATH, force=False):
+    """
+    Brings the region table, one row per NOC code, up to date with the noc_regions file, keyed on the code.
+
+    :return: dict with the seed name, whether it was skipped and the numbers of rows upserted and deleted
+    """
+    from my_flask_app.models import Region
+    return seed_table(db.session, Seed('noc_regions', filepath, Region.__table__, 'noc', read_noc_regions), force)
+
+
+def seed_all(force=False):
+    """ Applies every seed, call from within an app context; :return: list of the result dict of each seed """
+    return [seed_regions(force=force)]
+
+
+def _import_models():
+    import my_flask_app.models  # noqa: F401
+
+
+if __name__ == '__main__':
+    seed_cli(db, _import_models, seed_all, 'my_flask_app.config.DevelopmentConfig')
@@ -0,0 +1,235 @@
+""" Simplified country outlines for the medals choropleth, prepared once from data/countries.geojson.
+
+The source GeoJSON is too detailed to send to a browser and needed geopandas to read. Instead it is simplified, with
+the Douglas-Peucker algorithm, to one outline per country for each of a few detail levels, its properties other than
+the country code are dropped and its coordinates are rounded. The result is cached as gzipped JSON with:
+
+    python -m paralympic_app.country_geometry
+
+Figures only read the cache, which is rebuilt when the source GeoJSON changes. Neither step needs geopandas.
+"""
+import gzip
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from .data_cache import DATA_DIR, file_sha256
+except ImportError:  # Imported as a top-level module when paralympic_app.py is run as a script
+    from data_cache import DATA_DIR, file_sha256
+
+GEOJSON_FILEPATH = DATA_DIR.joinpath('countries.geojson')
+GEOMETRY_CACHE_FILEPATH = DATA_DIR.joinpath('countries.simplified.json.gz')
+
+# (highest map zoom the level is used for, simplification tolerance in degrees, decimal places kept), least detailed
+# first; the last level is used for any greater zoom
+DETAIL_LEVELS = (
+    (2, 0.1, 2),
+    (4, 0.02, 3),
+    (None, 0.005, 3),
+)
+
+# Codes in the NPC column of the medals data that are not the ISO 3166 alpha-3 code of the country
+NPC_TO_ISO_A3 = {
+    'ALG': 'DZA', 'ANG': 'AGO', 'BAH': 'BHS', 'BIR': 'MMR', 'BOT': 'BWA', 'BRN': 'BHR', 'BUL': 'BGR', 'CHI': 'CHL',
+    'CRO': 'HRV', 'DEN': 'DNK', 'EUN': 'RUS', 'FIJ': 'FJI', 'FRG': 'DEU', 'GDR': 'DEU', 'GER': 'DEU', 'GRE': 'GRC',
+    'GUA': 'GTM', 'INA': 'IDN', 'IRI': 'IRN', 'KSA': 'SAU', 'KUW': 'KWT', 'LAT': 'LVA', 'LBA': 'LBY', 'MAS': 'MYS',
+    'MGL': 'MNG', 'NED': 'NLD', 'NGR': 'NGA', 'PHI': 'PHL', 'PLE': 'PSE', 'POR': 'PRT', 'PUR': 'PRI', 'RHO': 'ZWE',
+    'RSA': 'ZAF', 'SCG': 'SRB', 'SLO': 'SVN', 'SRI': 'LKA', 'SUD': 'SDN', 'SUI': 'CHE', 'TCH': 'CZE', 'TPE': 'TWN',
+    'UAE': 'ARE', 'URS': 'RUS', 'URU': 'URY', 'VIE': 'VNM', 'YUG': 'SRB', 'ZIM': 'ZWE',
+}
+
+_levels = None
+_lock = threading.Lock()
+
+
+def npc_to_iso_a3(npc):
+    """
+    :param npc: str NPC code from the medals data e.g. 'GER'
+    :return: str ISO 3166 alpha-3 code of the country the outlines are keyed by e.g. 'DEU'
+    """
+    return NPC_TO_ISO_A3.get(npc, npc)
+
+
+def countries_geojson(iso_codes=None, zoom=1):
+    """
+    Gets the simplified country outlines for a map zoom level.
+
+    :param iso_codes: ISO 3166 alpha-3 codes of the countries to include, defaults to all
+    :param zoom: map zoom level the outlines will first be shown at
+    :return: dict GeoJSON FeatureCollection with each feature's id set to its country code
+    """
+    geometries = _detail_level(zoom)
+    if iso_codes is None:
+        iso_codes = geometries
+    features = [{'type': 'Feature', 'id': code, 'properties': None, 'geometry': geometries[code]}
+                for code in dict.fromkeys(iso_codes) if code in geometries]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def build_geometry_cache(geojson_filepath=GEOJSON_FILEPATH, cache_filepath=GEOMETRY_CACHE_FILEPATH):
+    """
+    Simplifies the countries in a GeoJSON file to each of the DETAIL_LEVELS and writes them to the cache.
+
+    :return: dict the cached data
+    """
+    with open(geojson_filepath, encoding='utf-8') as f:
+        source = json.load(f)
+    countries = {}
+    for feature in source['features']:
+        code = _country_code(feature.get('properties') or {})
+        geometry = feature.get('geometry')
+        if code is None or geometry is None:
+            continue
+        countries.setdefault(code, []).extend(_polygons(geometry))
+
+    levels = []
+    for max_zoom, tolerance, decimals in DETAIL_LEVELS:
+        geometries = {}
+        for code, polygons in countries.items():
+            simplified = simplify_polygons(polygons, tolerance, decimals)
+            if simplified:
+                geometries[code] = {'type': 'MultiPolygon', 'coordinates': simplified}
+        levels.append({'max_zoom': max_zoom, 'tolerance': tolerance, 'countries': geometries})
+    cache = {'source_sha256': file_sha256(geojson_filepath), 'levels': levels}
+
+    # Write then rename so other processes never read a half written file
+    cache_filepath = Path(cache_filepath)
+    tmp_filepath = cache_filepath.with_name(f'{cache_filepath.name}.{os.getpid()}.tmp')
+    try:
+        with gzip.open(tmp_filepath, 'wt', encoding='utf-8') as f:
+            json.dump(cache, f, separators=(',', ':'))
+        os.replace(tmp_filepath, cache_filepath)
+    finally:
+        if tmp_filepath.exists():
+            tmp_filepath.unlink()
+    return cache
+
+
+def simplify_polygons(polygons, tolerance, decimals):
+    """
+    Simplifies the polygons of a country. Rings that collapse are dropped, except that a country always keeps its
+    largest polygon, simplified less if need be, so small island nations still appear on the map.
+
+    :param polygons: list of polygons, each a list of rings, each a list of [lon, lat] points
+    :param tolerance: maximum distance, in degrees, of a removed point from the simplified outline
+    :param decimals: number of decimal places to round coordinates to
+    :return: list of simplified polygons, as MultiPolygon coordinates
+    """
+    simplified = []
+    for polygon in polygons:
+        rings = [_simplify_ring(np.asarray(ring, dtype=float), tolerance, decimals) for ring in polygon]
+        if rings and rings[0] is not None:
+            simplified.append([ring for ring in rings if ring is not None])
+    if not simplified and polygons:
+        exterior = np.asarray(max(polygons, key=lambda polygon: len(polygon[0]))[0], dtype=float)
+        ring = None
+        while ring is None and tolerance > 10 ** -decimals:
+            tolerance /= 2
+            ring = _simplify_ring(exterior, tolerance, decimals)
+        if ring is not None:
+            simplified.append([ring])
+    return simplified
+
+
+def _simplify_ring(points, tolerance, decimals):
+    """ :return: list of the simplified and rounded points of a closed ring, or None if it collapses """
+    if len(points) < 4:
+        return None
+    points = np.round(points[_douglas_peucker(points, tolerance)], decimals)
+    # Rounding can leave neighbouring points equal
+    points = points[np.r_[True, np.any(np.diff(points, axis=0) != 0, axis=1)]]
+    if len(points) < 4:
+        return None
+    return points.tolist()
+
+
+def _douglas_peucker(points, tolerance):
+    """ :return: bool array of the points to keep """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        between = points[first + 1:last]
+        direction = end - start
+        length = np.hypot(*direction)
+        if length == 0:
+            # The start and end of a closed ring are the same point
+            distances = np.hypot(*(between - start).T)
+        else:
+            distances = np.abs(direction[0] * (between[:, 1] - start[1])
+                               - direction[1] * (between[:, 0] - start[0])) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.extend([(first, split), (split, last)])
+    return keep
+
+
+def _country_code(properties):
+    # Some Natural Earth countries, e.g. France and Norway, have an ISO_A3 of -99
+    for key in ('ISO_A3', 'ADM0_A3', 'iso_a3', 'adm0_a3'):
+        code = properties.get(key)
+        if code and code != '-99':
+            return code
+    return None
+
+
+def _polygons(geometry):
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def _detail_level(zoom):
+    levels = _load_levels()
+    for level in levels:
+        if level['max_zoom'] is None or zoom <= level['max_zoom']:
+            return level['countries']
+    return levels[-1]['countries']
+
+
+def _load_levels():
+    global _levels
+    if _levels is None:
+        with _lock:
+            if _levels is None:
+                _levels = _read_cache()['levels']
+    return _levels
+
+
+def _read_cache():
+    """ Reads the cache, first rebuilding it if the source GeoJSON has changed since it was built. """
+    cache = None
+    try:
+        with gzip.open(GEOMETRY_CACHE_FILEPATH, 'rt', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if GEOJSON_FILEPATH.exists():
+        if cache is None or cache.get('source_sha256') != file_sha256(GEOJSON_FILEPATH):
+            cache = build_geometry_cache()
+    elif cache is None:
+        raise FileNotFoundError(f"Neither {GEOMETRY_CACHE_FILEPATH} nor the {GEOJSON_FILEPATH} it is built from exist.")
+    return cache
+
+
+if __name__ == '__main__':
+    geojson_path = Path(sys.argv[1]) if len(sys.argv) > 1 else GEOJSON_FILEPATH
+    built = build_geometry_cache(geojson_path)
+    for detail_level in built['levels']:
+        points = sum(len(ring) for geometry in detail_level['countries'].values()
+                     for polygon in geometry['coordinates'] for ring in polygon)
+        print(f"zoom <= {detail_level['max_zoom']}: {len(detail_level['countries'])} countries, {points} points")
+    print(f"{GEOMETRY_CACHE_FILEPATH}: {GEOMETRY_CACHE_FILEPATH.stat().st_size} bytes")
@@ -1,11 +1,31 @@
 """ Helper functions for creating the charts in the activities. """
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objs as go
-from pathlib import Path
 
-EVENT_DATA_FILEPATH = Path(__file__).parent.joinpath('data', 'paralympics.csv')
-MEDALS_DATA_FILEPATH = Path(__file__).parent.joinpath('data', 'all_medals.csv')
+try:
+    from .country_geometry import countries_geojson, npc_to_iso_a3
+    from .dataset import get_dataset
+    from .figure_artifacts import FigureArtifacts
+    from .figure_cache import FigureCache
+    from .map_tiles import TILE_ATTRIBUTION, tile_url
+except ImportError:  # Imported as a top-level module when paralympic_app.py is run as a script
+    from country_geometry import countries_geojson, npc_to_iso_a3
+    from dataset import get_dataset
+    from figure_artifacts import FigureArtifacts
+    from figure_cache import FigureCache
+    from map_tiles import TILE_ATTRIBUTION, tile_url
+
+NO_HIGHLIGHTS_TEXT = 'No highlights are available for this event.'
+# Above this total size the highlights are looked up on the server when a map point is hovered over, rather than
+# being sent with the map figure
+HIGHLIGHTS_INLINE_MAX_BYTES = 64 * 1024
+# Position of the highlights text in the customdata of scatter_mapbox_para_locations(..., include_highlights=True)
+MAP_CUSTOMDATA_HIGHLIGHTS = 5
+
+# Prebuilt figures, see figure_artifacts.py
+figure_artifacts = FigureArtifacts()
+# Figures built by the functions below for the Dash callbacks, cleared whenever the dataset is reloaded
+figure_cache = FigureCache(maxsize=32, version=lambda: get_dataset().version, artifacts=figure_artifacts)
 
 
 def line_chart_over_time(chart_type):
@@ -15,8 +35,7 @@ def line_chart_over_time(chart_type):
 
     :return: Plotly Express line chart
     """
-    cols = ['REF', 'TYPE', 'YEAR', 'LOCATION', 'EVENTS', 'SPORTS', 'COUNTRIES', 'PARTICIPANTS']
-    df_events = pd.read_csv(EVENT_DATA_FILEPATH, usecols=cols)
+    df_events = get_dataset().events()
     title_text = f"Has the number of {chart_type.lower()} changed over time?"
     fig_line = px.line(df_events,
                        x='YEAR',
@@ -43,8 +62,7 @@ def stacked_bar_gender(event_type):
     :type event_type: str Winter or Summer
     :return: Plotly Express bar chart
     """
-    cols = ['TYPE', 'YEAR', 'LOCATION', 'MALE', 'FEMALE', 'PARTICIPANTS']
-    df_events = pd.read_csv(EVENT_DATA_FILEPATH, usecols=cols)
+    df_events = get_dataset().events()
     df_events.drop([0], inplace=True, )
     df_events.reset_index(drop=True)
     df_events['M%'] = df_events['MALE'] / df_events['PARTICIPANTS']
@@ -66,59 +84,57 @@ def stacked_bar_gender(event_type):
 
 def get_country_results(NOC_code):
     """
-    Adds the summer/winter event_type column to the medals' data for a specified country and returns the merged data
-    as a dataframe.
+    Gets the medals' data for a specified country, with the summer/winter event type in the TYPE column.
     :param NOC_code: NOC three digit country code
     :return: DataFrame with the medal data for all years for the specified country
     """
-    df = pd.read_csv(MEDALS_DATA_FILEPATH)
-    df_event = pd.read_csv(EVENT_DATA_FILEPATH, usecols=['TYPE', 'MERGE_COL'])
-    df_merged = df.merge(df_event, how='left', left_on='location', right_on='MERGE_COL')
-    df_sorted = df_merged.sort_values(by=['NPC', 'year'])
-    df_country = df_sorted.loc[df_sorted['NPC'] == NOC_code]
-    df_country['location-year'] = df_country['location'] + ' ' + df_country['year'].astype(str)
-    return df_country
+    return get_dataset().medals_store().for_country(NOC_code)
 
 
-def scatter_mapbox_para_locations(mapbox_type):
+def scatter_mapbox_para_locations(mapbox_type, include_highlights=False, tile_proxy_url=None):
     """
     Creates a scatter mapbox of the paralympic locations using either Open Street Map or USGS mapbox in Plotly
     Express as neither requires a token.
     :type mapbox_type: str either OSM for OpenStreetMap or USGS
+    :param include_highlights: add each event's highlights text to its point's customdata, at index
+    MAP_CUSTOMDATA_HIGHLIGHTS, if highlights_inline() allows it
+    :param tile_proxy_url: URL of a tile proxy to load the tiles from, see map_tiles.tile_url, or None for upstream
     :return: Plotly Express scatter mapbox figure
     """
     valid = {'OSM', 'USGS'}
     if mapbox_type not in valid:
         raise ValueError("Mapbox type must be one of %r." % valid)
-    df_locations = pd.read_csv(EVENT_DATA_FILEPATH)
+    df_locations = get_dataset().events()
+    # customdata holds these columns in this order, shown on hover if True
+    hover_data = {
+        'LAT': False,
+        'LON': False,
+        'LOCATION': False,
+        'YEAR': True,
+        'TYPE': True
+    }
+    if include_highlights and highlights_inline():
+        hover_data['HIGHLIGHTS'] = False
     fig = px.scatter_mapbox(df_locations,
                             lat='LAT',
                             lon='LON',
                             labels={'YEAR': 'Year', 'TYPE': 'Event type'},
                             hover_name='LOCATION',
-                            hover_data={
-                                'LAT': False,
-                                'LON': False,
-                                'LOCATION': False,
-                                'YEAR': True,
-                                'TYPE': True
-                            },
+                            hover_data=hover_data,
                             color_discrete_sequence=['fuchsia'],
                             zoom=1)
-    if mapbox_type == 'OSM':
+    if mapbox_type == 'OSM' and tile_proxy_url is None:
         fig.update_layout(mapbox_style='open-street-map')
     else:
+        # Also used for OpenStreetMap when its tiles come from a tile proxy, see map_tiles.py
         fig.update_layout(
             mapbox_style='white-bg',
             mapbox_layers=[
                 {
                     'below': 'traces',
                     'sourcetype': 'raster',
-                    'sourceattribution': "United States Geological Survey",
-                    'source': [
-                        "https://basemap.nationalmap.gov/arcgis/rest/services/USGSImageryOnly/MapServer/tile/{z}/{"
-                        "y}/{x}"
-                    ]
+                    'sourceattribution': TILE_ATTRIBUTION[mapbox_type],
+                    'source': [tile_url(mapbox_type, tile_proxy_url)]
                 }
             ])
 
@@ -128,39 +144,86 @@ def scatter_mapbox_para_locations(mapbox_type):
     return fig
 
 
+def highlights_inline():
+    """
+    Whether the event highlights are small enough to send to the browser with the map figure, so that showing them on
+    hover needs no request to the server.
+
+    :return: bool
+    """
+    highlights = get_dataset().highlights().values()
+    return sum(len(text.encode('utf-8')) for text in highlights) <= HIGHLIGHTS_INLINE_MAX_BYTES
+
+
 def get_event_highlights(location, year):
-    cols = ['LOCATION', 'YEAR', 'HIGHLIGHTS']
-    dtypes = {'YEAR': 'int'}
-    df_highlights = pd.read_csv(EVENT_DATA_FILEPATH, usecols=cols, dtype=dtypes)
-    highlight = df_highlights[(df_highlights['LOCATION'] == location) & (df_highlights['YEAR'] == year)]
-    highlight_text = highlight.iloc[0, 2]
-    return highlight_text
+    """
+    Looks up the highlights text for the paralympics held in a given location and year.
+
+    :param location: str LOCATION as in the paralympics data e.g. 'London'
+    :param year: int or str year of the event
+    :return: str highlights text, or NO_HIGHLIGHTS_TEXT if there is no event for that location and year
+    """
+    try:
+        key = (location, int(year))
+    except (TypeError, ValueError):
+        return NO_HIGHLIGHTS_TEXT
+    return get_dataset().highlights().get(key) or NO_HIGHLIGHTS_TEXT
 
 
 def table_top_ten_gold_table(df):
+    """
+    Creates a table of a medal leaderboard.
+
+    :param df: DataFrame from top_medals_data or top_ten_gold_data
+    :return: Plotly table figure
+    """
     fig = go.Figure(data=[go.Table(
-        columnorder=['Country', 'Gold'],
         header=dict(values=list(df.columns),
                     fill_color='lightskyblue',
                     align='left'),
-        cells=dict(values=[df.Country, df['Gold']],
+        cells=dict(values=[df[col] for col in df.columns],
                    fill_color='white',
                    align='left'))
     ])
     return fig
 
 
+def table_top_medals(medal='Gold', n=10, start_year=None, end_year=None, event_type=None):
+    """
+    Creates a table of the n countries who have won the most medals of a given type, see top_medals_data.
+
+    :return: Plotly table figure
+    """
+    return table_top_ten_gold_table(top_medals_data(medal, n, start_year, end_year, event_type))
+
+
 def top_ten_gold_data():
     """
         Get the data for the top 10 countries who have won the most medals since 1960
         :return: dataframe
         """
-    cols = ['Country', 'Gold']
-    df_gold = pd.read_csv(MEDALS_DATA_FILEPATH, usecols=cols)
-    df_gold = df_gold.groupby(by='Country', as_index=False).sum()
-    df_gold = df_gold.sort_values(by='Gold', ascending=False)
-    df_gold_ten = df_gold[0:10]
-    return df_gold_ten
+    return top_medals_data('Gold', 10)
+
+
+def top_medals_data(medal='Gold', n=10, start_year=None, end_year=None, event_type=None):
+    """
+    Get the data for the n countries who have won the most medals of a given type.
+
+    :param medal: str one of 'Gold', 'Silver', 'Bronze' or 'Total'
+    :param n: int number of countries
+    :param start_year: int first year to include, defaults to 1960
+    :param end_year: int last year to include, defaults to the latest paralympics
+    :param event_type: str 'Summer' or 'Winter', defaults to both
+    :return: dataframe with the columns 'Country' and the medal type
+    """
+    return get_dataset().medals_store().leaderboard.top(medal, n, start_year, end_year, event_type)
+
+
+def leaderboard_years():
+    """
+    :return: list of the years with medal data, for the leaderboard year range control
+    """
+    return get_dataset().medals_store().leaderboard.years.tolist()
 
 
 def get_medals_table_data(location, year):
@@ -168,36 +231,37 @@ def get_medals_table_data(location, year):
     Given a specific paralympic location and year, get the data for the medal results.
     :return: data frane
     """
-    df_medals = pd.read_csv(MEDALS_DATA_FILEPATH)
-    df_medals_event = df_medals[(df_medals['Event'] == location) & (df_medals['Year'] == year)]
-    return df_medals_event
+    return get_dataset().medals_store().for_event(location, year)
 
 
-''' Removed due to the file size of the geo data and removes the need to install geopandas.
-def choropleth_mapbox_medals(df):
+def choropleth_mapbox_medals(df, zoom=1):
     """
     Creates a choropleth map showing medal performance of countries in a given paralympic location/year.
 
+    The country outlines come from the simplified copy of countries.geojson made by country_geometry.py, at the detail
+    for the zoom level, and only the countries in df are sent with the figure.
+
+    :param df: DataFrame of medal results with the columns of the medals data e.g. from get_medals_table_data
+    :param zoom: initial zoom level of the map
     :return: Plotly Express choropleth
     """
-    geojson_file = Path(__file__).parent.joinpath('data', 'countries.geojson')
-    df_geojson = gpd.read_file(geojson_file)
+    df = df.assign(ISO_A3=df['NPC'].map(npc_to_iso_a3))
     max_medals = df['Total'].max()
     min_medals = df['Total'].min()
     fig = px.choropleth_mapbox(df,
-                               geojson=df_geojson,
-                               locations='NPC',
-                               featureidkey="properties.ISO_A3",
+                               geojson=countries_geojson(df['ISO_A3'], zoom),
+                               locations='ISO_A3',
                                color='Total',
                                color_continuous_scale="Viridis",
                                range_color=(min_medals, max_medals),
                                mapbox_style="carto-positron",
-                               zoom=1,
+                               zoom=zoom,
                                center={"lat": 0, "lon": 0},
                                opacity=0.5,
                                labels={'Total': 'Total medals'},
                                hover_name='Country',
                                hover_data={
+                                   'ISO_A3': False,
                                    'NPC': False,
                                    'Gold': True,
                                    'Silver': True,
@@ -207,4 +271,3 @@ def choropleth_mapbox_medals(df):
                                )
     fig.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0})
     return fig
-'''
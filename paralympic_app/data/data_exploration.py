@@ -1,10 +1,10 @@
-import pandas as pd
+""" Profiles the data files, see paralympic_app/data_profile.py, which streams them so they can be of any size. """
+import sys
+from pathlib import Path
 
-if __name__ == '__main__':
-    df_para = pd.read_csv('paralympics.csv')
-    print(df_para.info(verbose=True))
-    print(df_para.describe())
+sys.path.insert(0, str(Path(__file__).parents[2]))
+from paralympic_app.data_profile import main  # noqa: E402
 
-    df_medals = pd.read_csv('all_medals.csv')
-    print(df_medals.info(verbose=True))
-    print(df_medals.describe())
+if __name__ == '__main__':
+    data_dir = Path(__file__).parent
+    main([str(data_dir.joinpath('paralympics.csv')), str(data_dir.joinpath('all_medals.csv'))] + sys.argv[1:])
@@ -0,0 +1,139 @@
+""" Binary (Feather) copies of the CSV files in the data directory, so processes after the first skip CSV parsing.
+
+The CSV files remain the source of truth. Each Feather file records the size, modification time and SHA-256 of the
+CSV it was converted from, along with the dtypes used to read it, and is rebuilt whenever these no longer match.
+Feather support needs pyarrow; without it the CSV files are read directly.
+
+Convert every CSV in the data directory ahead of time with:
+
+    python -m paralympic_app.data_cache
+"""
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+DATA_DIR = Path(__file__).parent.joinpath('data')
+CACHE_SUFFIX = '.feather'
+_METADATA_KEY = b'paralympic_app.source'
+
+
+def read_csv_cached(csv_filepath, dtype=None, memory_map=True):
+    """
+    Reads a CSV file from its Feather copy, converting it first if the copy is missing or out of date.
+
+    :param csv_filepath: path to the CSV file
+    :param dtype: dict of column dtypes, passed to pandas.read_csv when the CSV has to be parsed
+    :param memory_map: memory-map the Feather file rather than reading it into a buffer
+    :return: DataFrame
+    """
+    csv_filepath = Path(csv_filepath)
+    if feather is None:
+        return pd.read_csv(csv_filepath, dtype=dtype)
+
+    cache_filepath = cache_path_for(csv_filepath)
+    source = _source_stat(csv_filepath, dtype)
+    table = _read_fresh_cache(cache_filepath, csv_filepath, source, memory_map)
+    if table is not None:
+        return table.to_pandas()
+
+    df = pd.read_csv(csv_filepath, dtype=dtype)
+    source['sha256'] = file_sha256(csv_filepath)
+    try:
+        _write_cache(df, cache_filepath, source)
+    except OSError:
+        # A read-only data directory only costs us the cache, not the data
+        pass
+    return df
+
+
+def convert_data_dir(data_dir=DATA_DIR, dtypes=None):
+    """
+    Converts every CSV file in a directory to Feather, skipping those whose Feather copy is already up to date.
+
+    :param data_dir: directory containing the CSV files
+    :param dtypes: optional dict mapping CSV file name to the dtype dict to read it with
+    :return: list of the Feather file paths
+    """
+    if feather is None:
+        raise RuntimeError("pyarrow is required to convert the data files, install it with 'pip install pyarrow'.")
+    dtypes = dtypes or {}
+    converted = []
+    for csv_filepath in sorted(Path(data_dir).glob('*.csv')):
+        read_csv_cached(csv_filepath, dtype=dtypes.get(csv_filepath.name))
+        converted.append(cache_path_for(csv_filepath))
+    return converted
+
+
+def cache_path_for(csv_filepath):
+    return Path(csv_filepath).with_suffix(CACHE_SUFFIX)
+
+
+def _source_stat(csv_filepath, dtype):
+    stat = csv_filepath.stat()
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'dtype': json.dumps(dtype, sort_keys=True, default=str),
+    }
+
+
+def _read_fresh_cache(cache_filepath, csv_filepath, source, memory_map):
+    """ Reads the Feather copy if it was made from the same CSV content with the same dtypes, otherwise None. """
+    if not cache_filepath.exists():
+        return None
+    try:
+        table = feather.read_table(cache_filepath, memory_map=memory_map)
+        recorded = json.loads(table.schema.metadata[_METADATA_KEY])
+    except (pa.ArrowInvalid, OSError, KeyError, TypeError, ValueError):
+        return None
+    if recorded.get('dtype') != source['dtype'] or recorded.get('size') != source['size']:
+        return None
+    if recorded.get('mtime_ns') == source['mtime_ns']:
+        return table
+    # Touched but possibly unchanged, e.g. after a fresh checkout, so fall back to comparing the content
+    if recorded.get('sha256') == file_sha256(csv_filepath):
+        return table
+    return None
+
+
+def _write_cache(df, cache_filepath, source):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_METADATA_KEY] = json.dumps(source).encode()
+    table = table.replace_schema_metadata(metadata)
+    # Write then rename so other processes never read a half written file; uncompressed so it can be memory-mapped
+    tmp_filepath = cache_filepath.with_name(f'{cache_filepath.name}.{os.getpid()}.tmp')
+    try:
+        feather.write_feather(table, tmp_filepath, compression='uncompressed')
+        os.replace(tmp_filepath, cache_filepath)
+    finally:
+        if tmp_filepath.exists():
+            tmp_filepath.unlink()
+
+
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+if __name__ == '__main__':
+    from paralympic_app.dataset import EVENT_DATA_FILEPATH, EVENT_DTYPES, MEDALS_DATA_FILEPATH, MEDALS_DTYPES
+
+    data_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else DATA_DIR
+    known_dtypes = {EVENT_DATA_FILEPATH.name: EVENT_DTYPES, MEDALS_DATA_FILEPATH.name: MEDALS_DTYPES}
+    for path in convert_data_dir(data_dir, known_dtypes):
+        print(path)
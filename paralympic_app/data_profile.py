@@ -0,0 +1,251 @@
+""" Profiles CSV files of any size by streaming them in chunks, so memory use does not grow with the file.
+
+For each column the profile has its type, the number of nulls, the minimum and maximum, the number of distinct values
+(counted exactly up to EXACT_DISTINCT_LIMIT and estimated with HyperLogLog beyond that) and, for numeric columns, the
+mean and quantiles estimated from a fixed size uniform sample. Profile files, and write a JSON report, with:
+
+    python -m paralympic_app.data_profile paralympic_app/data/all_medals.csv -o all_medals.profile.json
+"""
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CHUNKSIZE = 100_000
+SAMPLE_SIZE = 10_000
+EXACT_DISTINCT_LIMIT = 10_000
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+REPORT_SUFFIX = '.profile.json'
+
+
+class HyperLogLog:
+    """
+    Estimates the number of distinct 64-bit hashes added to it, to within about 1.04 / sqrt(2 ** precision).
+
+    :param precision: number of hash bits used to pick a register, 2 ** precision bytes of registers are kept
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def add(self, hashes):
+        """ :param hashes: uint64 array """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest_bits = 64 - self.precision
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # The register value is the position of the first 1 bit in the rest of the hash
+        ranks = rest_bits - _bit_length(rest) + 1
+        # Sorted, the last entry for each register has its highest rank; faster than np.maximum.at
+        keys = np.unique(index * 64 + ranks)
+        index, ranks = keys // 64, (keys % 64).astype(np.uint8)
+        last = np.r_[index[1:] != index[:-1], True]
+        self.registers[index[last]] = np.maximum(self.registers[index[last]], ranks[last])
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small counts
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+def _bit_length(values):
+    """ :return: int64 array of the bit length of each uint64 value """
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        large = values >= np.uint64(1 << shift)
+        lengths[large] += shift
+        values[large] >>= np.uint64(shift)
+    return lengths + (values > 0)
+
+
+class ColumnProfile:
+    """
+    Statistics of one CSV column, updated a chunk at a time.
+
+    :param name: column name
+    :param sample_size: number of numeric values kept to estimate quantiles from
+    :param rng: numpy Generator used to sample
+    """
+
+    def __init__(self, name, sample_size=SAMPLE_SIZE, rng=None):
+        self.name = name
+        self.sample_size = sample_size
+        self.rng = rng if rng is not None else np.random.default_rng(0)
+        self.count = 0
+        self.nulls = 0
+        self.numeric = 0
+        self.integral = 0
+        self.min_text = None
+        self.max_text = None
+        self.min_length = None
+        self.max_length = None
+        self.min_value = math.inf
+        self.max_value = -math.inf
+        self.total = 0.0
+        self._distinct = set()
+        self._hll = HyperLogLog()
+        # Bottom-k sampling: each numeric value gets a random key and the values with the smallest keys are kept,
+        # which is a uniform sample of all the values however many chunks they arrive in
+        self._sample = np.empty(0)
+        self._sample_keys = np.empty(0)
+
+    def update(self, column):
+        """ :param column: Series of str values of this column from one chunk, with NaN for nulls """
+        self.count += len(column)
+        values = column.dropna()
+        self.nulls += len(column) - len(values)
+        if values.empty:
+            return
+
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        self._hll.add(hashes)
+        if self._distinct is not None:
+            self._distinct.update(hashes.tolist())
+            if len(self._distinct) > EXACT_DISTINCT_LIMIT:
+                self._distinct = None
+
+        lengths = values.str.len()
+        self.min_length = _min(self.min_length, int(lengths.min()))
+        self.max_length = _max(self.max_length, int(lengths.max()))
+        self.min_text = _min(self.min_text, values.min())
+        self.max_text = _max(self.max_text, values.max())
+
+        if self.numeric < self.count - self.nulls - len(values):
+            # An earlier chunk had text, so this is a string column whatever is in this chunk
+            return
+        numbers = pd.to_numeric(values, errors='coerce').dropna().to_numpy(dtype=float)
+        numbers = numbers[np.isfinite(numbers)]
+        self.numeric += len(numbers)
+        if not len(numbers):
+            return
+        self.integral += int(np.count_nonzero(numbers == np.floor(numbers)))
+        self.min_value = min(self.min_value, float(numbers.min()))
+        self.max_value = max(self.max_value, float(numbers.max()))
+        self.total += float(numbers.sum())
+        self._add_to_sample(numbers)
+
+    def report(self):
+        """ :return: dict of the column statistics, JSON serializable """
+        non_null = self.count - self.nulls
+        if non_null == 0:
+            column_type = 'empty'
+        elif self.numeric < non_null:
+            column_type = 'string'
+        elif self.integral == non_null:
+            column_type = 'integer'
+        else:
+            column_type = 'float'
+        exact = self._distinct is not None
+        report = {
+            'type': column_type,
+            'count': self.count,
+            'nulls': self.nulls,
+            'distinct': len(self._distinct) if exact else self._hll.count(),
+            'distinct_exact': exact,
+        }
+        if column_type == 'string':
+            report.update(min=self.min_text, max=self.max_text, min_length=self.min_length,
+                          max_length=self.max_length)
+        elif column_type in ('integer', 'float'):
+            cast = int if column_type == 'integer' else float
+            quantiles = np.quantile(self._sample, QUANTILES)
+            report.update(min=cast(self.min_value), max=cast(self.max_value), mean=self.total / non_null,
+                          quantiles={str(q): float(value) for q, value in zip(QUANTILES, quantiles)},
+                          quantiles_exact=self.numeric <= self.sample_size)
+        return report
+
+    def _add_to_sample(self, numbers):
+        keys = self.rng.random(len(numbers))
+        sample = np.concatenate([self._sample, numbers])
+        sample_keys = np.concatenate([self._sample_keys, keys])
+        if len(sample) > self.sample_size:
+            keep = np.argpartition(sample_keys, self.sample_size - 1)[:self.sample_size]
+            sample, sample_keys = sample[keep], sample_keys[keep]
+        self._sample, self._sample_keys = sample, sample_keys
+
+
+def _min(current, value):
+    return value if current is None else min(current, value)
+
+
+def _max(current, value):
+    return value if current is None else max(current, value)
+
+
+def profile_csv(csv_filepath, chunksize=CHUNKSIZE, sample_size=SAMPLE_SIZE, seed=0):
+    """
+    Profiles a CSV file, reading chunksize rows at a time. Values are read as text, so the type of a column is that
+    of all its values rather than of the first chunk pandas sees.
+
+    :param csv_filepath: path to the CSV file
+    :param chunksize: number of rows read at a time
+    :param sample_size: number of values per numeric column kept to estimate quantiles from
+    :param seed: seed of the random sample, so reports of the same file are the same
+    :return: dict report with the file, its number of rows and the statistics of each column
+    """
+    csv_filepath = Path(csv_filepath)
+    rng = np.random.default_rng(seed)
+    columns = {}
+    rows = 0
+    for chunk in pd.read_csv(csv_filepath, dtype=str, chunksize=chunksize):
+        if not columns:
+            columns = {name: ColumnProfile(name, sample_size, rng) for name in chunk.columns}
+        rows += len(chunk)
+        for name, profile in columns.items():
+            profile.update(chunk[name])
+    return {
+        'file': str(csv_filepath),
+        'size_bytes': csv_filepath.stat().st_size,
+        'rows': rows,
+        'chunksize': chunksize,
+        'columns': {name: profile.report() for name, profile in columns.items()},
+    }
+
+
+def write_report(report, report_filepath):
+    with open(report_filepath, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def print_summary(report, file=sys.stdout):
+    """ Prints a table of a report's columns, one line per column. """
+    print(f"{report['file']}: {report['rows']} rows, {report['size_bytes']} bytes", file=file)
+    for name, column in report['columns'].items():
+        distinct = f"{'' if column['distinct_exact'] else '~'}{column['distinct']}"
+        print(f"  {name:<24} {column['type']:<8} nulls={column['nulls']:<8} distinct={distinct:<9} "
+              f"min={column.get('min')!s:.20} max={column.get('max')!s:.20}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('csv', nargs='+', help='CSV files to profile')
+    parser.add_argument('-o', '--output', help=f'report file, defaults to the CSV file name with {REPORT_SUFFIX}; '
+                                               'with more than one CSV file, one report of all of them')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE, help='rows read at a time')
+    parser.add_argument('--sample-size', type=int, default=SAMPLE_SIZE, help='values kept to estimate quantiles')
+    args = parser.parse_args(argv)
+
+    reports = []
+    for csv_filepath in args.csv:
+        report = profile_csv(csv_filepath, args.chunksize, args.sample_size)
+        print_summary(report)
+        if not args.output:
+            write_report(report, Path(csv_filepath).with_suffix(REPORT_SUFFIX))
+        reports.append(report)
+    if args.output:
+        write_report(reports[0] if len(reports) == 1 else {'files': reports}, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+""" Shared in-memory copy of the paralympic events and medals data used by the chart builders and Dash callbacks. """
+import contextlib
+import threading
+from pathlib import Path
+from types import MappingProxyType
+
+try:
+    from .data_cache import read_csv_cached
+    from .leaderboard import MedalLeaderboard
+except ImportError:  # Imported as a top-level module when paralympic_app.py is run as a script
+    from data_cache import read_csv_cached
+    from leaderboard import MedalLeaderboard
+
+EVENT_DATA_FILEPATH = Path(__file__).parent.joinpath('data', 'paralympics.csv')
+MEDALS_DATA_FILEPATH = Path(__file__).parent.joinpath('data', 'all_medals.csv')
+
+EVENT_DTYPES = {
+    'REF': 'str',
+    'TYPE': 'str',
+    'YEAR': 'int64',
+    'MERGE_COL': 'str',
+    'LOCATION': 'str',
+    'LAT': 'float64',
+    'LON': 'float64',
+    'NOC': 'str',
+    'START': 'str',
+    'END': 'str',
+    'DISABILITIES_INCLUDED': 'str',
+    'EVENTS': 'int64',
+    'SPORTS': 'int64',
+    'COUNTRIES': 'int64',
+    # Rome 1960 has no male/female split so these columns contain NaN
+    'MALE': 'float64',
+    'FEMALE': 'float64',
+    'PARTICIPANTS': 'int64',
+    'HIGHLIGHTS': 'str',
+}
+
+MEDALS_DTYPES = {
+    'Rank': 'int64',
+    'Country': 'str',
+    'NPC': 'str',
+    'Gold': 'int64',
+    'Silver': 'int64',
+    'Bronze': 'int64',
+    'Total': 'int64',
+    'Event': 'str',
+    'Year': 'int64',
+}
+
+
+class MedalsStore:
+    """
+    The medals data indexed by country (NPC) and by paralympic games (Event, Year), plus the medal leaderboard.
+
+    Both indexes are built once. The rows for each key are held contiguously, so a lookup returns a slice of the
+    indexed frame rather than a filtered copy of it. As with the dataset snapshots, the slices are read-only.
+
+    :param medals: DataFrame of the medals data
+    :param events: DataFrame of the events data, used to add the summer/winter TYPE of each games
+    """
+
+    def __init__(self, medals, events):
+        event_types = events[['MERGE_COL', 'YEAR', 'TYPE']]
+        by_country = medals.merge(event_types, how='left', left_on=['Event', 'Year'], right_on=['MERGE_COL', 'YEAR'])
+        by_country = by_country.drop(columns=['MERGE_COL', 'YEAR'])
+        by_country['location-year'] = by_country['Event'] + ' ' + by_country['Year'].astype(str)
+        self._by_country = read_only(by_country.sort_values(by=['NPC', 'Year'], kind='stable'))
+        self._country_slices = _group_slices(self._by_country, 'NPC')
+        self.leaderboard = MedalLeaderboard(self._by_country)
+        # Stable sort keeps the rows of each games in their original (rank) order
+        self._by_event = read_only(medals.sort_values(by=['Event', 'Year'], kind='stable'))
+        self._event_slices = _group_slices(self._by_event, ['Event', 'Year'])
+
+    def for_country(self, npc):
+        """
+        :param npc: NPC three letter country code
+        :return: DataFrame of the country's results for all years, with the TYPE of each games, sorted by year
+        """
+        return self._by_country.iloc[self._country_slices.get(npc, _EMPTY)]
+
+    def for_event(self, event, year):
+        """
+        :param event: str paralympic games as named in the Event column e.g. 'London'
+        :param year: int year of the games
+        :return: DataFrame of the medal table for the games
+        """
+        return self._by_event.iloc[self._event_slices.get((event, year), _EMPTY)]
+
+
+_EMPTY = slice(0, 0)
+
+
+def read_only(df):
+    """
+    Marks the arrays holding a DataFrame's values as read-only, in place, so that assigning into the frame, or into a
+    shallow copy or slice of it, raises ValueError rather than changing the shared data. Operations that return new
+    frames, such as sorting, merging or adding a column, are unaffected.
+
+    Only columns stored in NumPy arrays are marked. Columns stored in extension arrays, such as pyarrow-backed strings
+    (the default str dtype from pandas 3), have no writeable flag and are left as they are. With copy-on-write, the
+    default from pandas 3, assigning into a copy or slice no longer changes the frame it came from.
+
+    :return: the DataFrame
+    """
+    # pandas has no public way to reach the arrays a frame's columns are stored in, so this is best effort
+    for block in getattr(getattr(df, '_mgr', None), 'blocks', ()):
+        flags = getattr(block.values, 'flags', None)
+        if flags is not None:
+            flags.writeable = False
+    return df
+
+
+def _group_slices(df, keys):
+    """ Maps each group in a DataFrame that is sorted by the group keys to the slice of rows holding it. """
+    return {key: slice(rows[0], rows[-1] + 1) for key, rows in df.groupby(keys, sort=False).indices.items()}
+
+
+class ParalympicDataset:
+    """
+    Loads, parses and types the paralympic events and medals CSV files once and then serves snapshots of them.
+
+    The snapshots returned by `events()` and `medals()` are shallow copies: they share the column data with the
+    dataset rather than copying it, so they are cheap to take on every callback. The shared data is read-only, so
+    assigning values into a snapshot's existing columns raises ValueError; adding columns, dropping rows or sorting a
+    snapshot is fine, and a caller that needs to change values should take a deep copy with `.copy()`.
+    """
+
+    def __init__(self, events_filepath=EVENT_DATA_FILEPATH, medals_filepath=MEDALS_DATA_FILEPATH):
+        self.events_filepath = Path(events_filepath)
+        self.medals_filepath = Path(medals_filepath)
+        self.version = 0
+        self._events = None
+        self._medals = None
+        self._highlights = None
+        self._medals_store = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self):
+        return self._events is not None and self._medals is not None
+
+    def load(self):
+        """
+        Reads both CSV files if they have not already been read. Safe to call from several threads at once.
+
+        :return: the dataset, so calls can be chained
+        """
+        if not self.is_loaded:
+            with self._lock:
+                if not self.is_loaded:
+                    self._read_files()
+        return self
+
+    def reload(self):
+        """
+        Re-reads both CSV files, e.g. after the data has been edited, and increments `version` so that anything
+        derived from the previous data can tell that it is out of date.
+
+        :return: the dataset, so calls can be chained
+        """
+        with self._lock:
+            self._read_files()
+        return self
+
+    def events(self):
+        """
+        Read-only snapshot of the events data (one row per paralympic games).
+
+        :return: DataFrame sharing its data with the dataset
+        """
+        return self.load()._events.copy(deep=False)
+
+    def medals(self):
+        """
+        Read-only snapshot of the medals data (one row per country per paralympic games).
+
+        :return: DataFrame sharing its data with the dataset
+        """
+        return self.load()._medals.copy(deep=False)
+
+    def highlights(self):
+        """
+        Index of the highlights text for each paralympic games.
+
+        :return: read-only mapping of (LOCATION, YEAR) to HIGHLIGHTS
+        """
+        return self.load()._highlights
+
+    def medals_store(self):
+        """
+        The medals data indexed by country and by paralympic games.
+
+        :return: MedalsStore
+        """
+        return self.load()._medals_store
+
+    def _read_files(self):
+        events = read_csv_cached(self.events_filepath, dtype=EVENT_DTYPES)
+        medals = read_csv_cached(self.medals_filepath, dtype=MEDALS_DTYPES)
+        keys = zip(events['LOCATION'].tolist(), events['YEAR'].tolist())
+        self._highlights = MappingProxyType(dict(zip(keys, events['HIGHLIGHTS'].fillna('').tolist())))
+        self._medals_store = MedalsStore(medals, events)
+        self._events = read_only(events)
+        self._medals = read_only(medals)
+        self.version += 1
+
+
+_dataset = ParalympicDataset()
+
+
+def get_dataset():
+    """
+    Returns the dataset shared by every chart builder and callback in this process, loading it on first use.
+
+    :return: ParalympicDataset
+    """
+    return _dataset.load()
+
+
+@contextlib.contextmanager
+def using_dataset(dataset):
+    """
+    Makes get_dataset() return another dataset within a with block, e.g. one of synthetic data for a benchmark.
+    This changes the dataset for every thread, so is for scripts rather than the running app. Anything cached from
+    the data, such as create_charts.figure_cache, should be cleared on entering and leaving the block.
+
+    :param dataset: ParalympicDataset
+    """
+    global _dataset
+    previous = _dataset
+    _dataset = dataset
+    try:
+        yield dataset.load()
+    finally:
+        _dataset = previous
@@ -0,0 +1,218 @@
+""" Prebuilt JSON copies of every dashboard figure variant, each with a content hash to use as its ETag.
+
+The figures only depend on the CSV data and the code that draws them, so every variant can be rendered ahead of time
+with:
+
+    python -m paralympic_app.figure_artifacts
+
+This writes one JSON file per figure and a manifest.json to ARTIFACT_DIR. The manifest records the SHA-256 of the CSV
+files the figures were built from, of the modules that build them and the Plotly version, and the map tile URLs they
+point at; if any of these has changed since, the artifacts are ignored and the figures are built as usual.
+"""
+import ast
+import hashlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+try:
+    from .data_cache import file_sha256
+    from .dataset import EVENT_DATA_FILEPATH, MEDALS_DATA_FILEPATH
+    from .map_tiles import tile_urls
+except ImportError:  # Imported as a top-level module when paralympic_app.py is run as a script
+    from data_cache import file_sha256
+    from dataset import EVENT_DATA_FILEPATH, MEDALS_DATA_FILEPATH
+    from map_tiles import tile_urls
+
+ARTIFACT_DIR = Path(__file__).parent.joinpath('figures')
+MANIFEST_FILENAME = 'manifest.json'
+PACKAGE_DIR = Path(__file__).parent
+
+# Every (create_charts function name, arguments) the dashboard can display
+FIGURE_VARIANTS = [
+    ('line_chart_over_time', ('EVENTS',)),
+    ('line_chart_over_time', ('SPORTS',)),
+    ('line_chart_over_time', ('COUNTRIES',)),
+    ('line_chart_over_time', ('PARTICIPANTS',)),
+    ('stacked_bar_gender', ('Winter',)),
+    ('stacked_bar_gender', ('Summer',)),
+    ('scatter_mapbox_para_locations', ('OSM',)),
+    ('scatter_mapbox_para_locations', ('USGS',)),
+    ('scatter_mapbox_para_locations', ('OSM', True)),
+    ('scatter_mapbox_para_locations', ('USGS', True)),
+    ('table_top_medals', ()),
+]
+
+
+def artifact_name(builder_name, args):
+    """
+    :return: str name of the artifact for a figure variant e.g. 'line_chart_over_time-EVENTS'
+    """
+    return '-'.join([builder_name] + [str(arg) for arg in args])
+
+
+def data_sha256():
+    """
+    :return: dict of the SHA-256 of each CSV file the figures are built from
+    """
+    return {path.name: file_sha256(path) for path in (EVENT_DATA_FILEPATH, MEDALS_DATA_FILEPATH)}
+
+
+def chart_modules():
+    """
+    :return: sorted list of the paths of create_charts.py and of every module of this package it imports, directly or
+    through other modules, which are the code the figures depend on
+    """
+    found = set()
+    pending = [PACKAGE_DIR.joinpath('create_charts.py')]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        pending += [PACKAGE_DIR.joinpath(f'{name}.py') for name in _imported_names(path)
+                    if PACKAGE_DIR.joinpath(f'{name}.py').is_file()]
+    return sorted(found)
+
+
+def _imported_names(path):
+    """ :return: set of the last part of the name of each module a module imports, e.g. 'dataset' for .dataset """
+    names = set()
+    for node in ast.walk(ast.parse(path.read_text(encoding='utf-8'))):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.rsplit('.', 1)[-1] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module is None or node.module == PACKAGE_DIR.name:
+                # from . import create_charts, from paralympic_app import create_charts
+                names.update(alias.name for alias in node.names)
+            else:
+                names.add(node.module.rsplit('.', 1)[-1])
+    return names
+
+
+def code_sha256():
+    """
+    :return: dict of the SHA-256 of each module in chart_modules(), and the Plotly version, which the figures' JSON
+    depends on
+    """
+    import plotly
+
+    versions = {path.name: file_sha256(path) for path in chart_modules()}
+    versions['plotly'] = plotly.__version__
+    return versions
+
+
+def build_artifacts(artifact_dir=ARTIFACT_DIR):
+    """
+    Renders every figure variant in FIGURE_VARIANTS to a JSON file and writes the manifest.
+
+    :param artifact_dir: directory to write to, created if needed
+    :return: dict the manifest
+    """
+    try:
+        from . import create_charts as cc
+    except ImportError:
+        import create_charts as cc
+
+    artifact_dir = Path(artifact_dir)
+    artifact_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {'data': data_sha256(), 'code': code_sha256(), 'tiles': tile_urls(), 'figures': {}}
+    for builder_name, args in FIGURE_VARIANTS:
+        name = artifact_name(builder_name, args)
+        fig_json = getattr(cc, builder_name)(*args).to_json()
+        filename = f'{name}.json'
+        artifact_dir.joinpath(filename).write_text(fig_json, encoding='utf-8')
+        manifest['figures'][name] = {
+            'file': filename,
+            'etag': hashlib.sha256(fig_json.encode('utf-8')).hexdigest()[:32],
+        }
+    # Written last, and atomically, so a half finished build is never picked up
+    tmp_path = artifact_dir.joinpath(f'{MANIFEST_FILENAME}.{os.getpid()}.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    os.replace(tmp_path, artifact_dir.joinpath(MANIFEST_FILENAME))
+    return manifest
+
+
+class FigureArtifacts:
+    """
+    Read access to the prebuilt figures. The manifest is read, and checked against the current data, on first use;
+    the JSON files themselves are read when first requested and then kept in memory.
+
+    :param artifact_dir: directory written by build_artifacts
+    """
+
+    def __init__(self, artifact_dir=ARTIFACT_DIR):
+        self.artifact_dir = Path(artifact_dir)
+        self._figures = None
+        self._json = {}
+        self._lock = threading.Lock()
+
+    def get_json(self, builder_name, args):
+        """
+        :param builder_name: name of the create_charts function
+        :param args: tuple of arguments to the function
+        :return: str JSON figure, or None if there is no up to date artifact for it
+        """
+        return self.get_json_by_name(artifact_name(builder_name, args))
+
+    def get_json_by_name(self, name):
+        """
+        :param name: artifact name, see artifact_name
+        :return: str JSON figure, or None if there is no up to date artifact with that name
+        """
+        entry = self._manifest_figures().get(name)
+        if entry is None:
+            return None
+        fig_json = self._json.get(name)
+        if fig_json is None:
+            try:
+                fig_json = self.artifact_dir.joinpath(entry['file']).read_text(encoding='utf-8')
+            except OSError:
+                return None
+            self._json[name] = fig_json
+        return fig_json
+
+    def etag(self, name):
+        """
+        :param name: artifact name, see artifact_name
+        :return: str content hash of the artifact, or None if there is no up to date artifact with that name
+        """
+        entry = self._manifest_figures().get(name)
+        return entry['etag'] if entry else None
+
+    def names(self):
+        return list(self._manifest_figures())
+
+    def validate(self):
+        """
+        Re-reads the manifest, e.g. after the data has been reloaded, dropping the artifacts if they are stale.
+        """
+        with self._lock:
+            self._figures = None
+            self._json = {}
+        self._manifest_figures()
+
+    def _manifest_figures(self):
+        if self._figures is None:
+            with self._lock:
+                if self._figures is None:
+                    self._figures = self._read_manifest()
+        return self._figures
+
+    def _read_manifest(self):
+        try:
+            manifest = json.loads(self.artifact_dir.joinpath(MANIFEST_FILENAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        if (manifest.get('data') != data_sha256() or manifest.get('code') != code_sha256()
+                or manifest.get('tiles') != tile_urls()):
+            return {}
+        return manifest.get('figures', {})
+
+
+if __name__ == '__main__':
+    out_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else ARTIFACT_DIR
+    for figure_name, figure_entry in build_artifacts(out_dir)['figures'].items():
+        print(f"{figure_entry['etag']}  {out_dir.joinpath(figure_entry['file'])}")
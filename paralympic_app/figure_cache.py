@@ -0,0 +1,128 @@
+""" Bounded LRU cache of serialized Plotly figures, keyed on the chart builder and its arguments. """
+import threading
+from collections import OrderedDict
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+
+class FigureCache:
+    """
+    Memoizes chart builders such as `line_chart_over_time(chart_type)` whose arguments come from a small set of
+    values. Figures are stored as JSON strings. A hit skips building the figure, which is the slow part, but `get`
+    still decodes the string into a new dict, so callers always get their own copy of the figure to work with, and
+    Dash then encodes that dict again for its response. Use `get_json` where the JSON string itself can be sent, e.g.
+    as a Flask response.
+
+    :param maxsize: maximum number of figures held; the least recently used figure is evicted beyond this
+    :param version: optional callable returning the current version of the data the figures are built from; when the
+    value changes the cache is cleared before the next lookup
+    :param artifacts: optional FigureArtifacts; a figure missing from the cache is read from its prebuilt artifact, if
+    there is one, instead of being built
+    :param renderer: optional function (builder, args, kwargs) returning the JSON figure, used instead of calling the
+    builder in this process e.g. FigureRenderPool.render
+    """
+
+    def __init__(self, maxsize=32, version=None, artifacts=None, renderer=None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._version = version
+        self._artifacts = artifacts
+        self.renderer = renderer
+        self._data_version = None
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, builder, *args, **kwargs):
+        """
+        Returns the figure for builder(*args, **kwargs) as a dict that can be passed straight to a `dcc.Graph`,
+        building it only if it is not already cached.
+
+        :param builder: function that returns a plotly Figure
+        :return: dict figure
+        """
+        return json_loads(self.get_json(builder, *args, **kwargs))
+
+    def get_json(self, builder, *args, **kwargs):
+        """
+        As `get` but returns the serialized figure.
+
+        :return: str JSON figure
+        """
+        key = self._make_key(builder, args, kwargs)
+        with self._lock:
+            self._check_version()
+            fig_json = self._figures.get(key)
+            if fig_json is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return fig_json
+            self.misses += 1
+
+        # Read or build outside the lock so a slow figure does not block lookups of other figures
+        fig_json = None
+        if self._artifacts is not None and not kwargs:
+            fig_json = self._artifacts.get_json(builder.__name__, args)
+        if fig_json is None and self.renderer is not None:
+            fig_json = self.renderer(builder, args, kwargs)
+        if fig_json is None:
+            fig_json = builder(*args, **kwargs).to_json()
+
+        with self._lock:
+            self._figures[key] = fig_json
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+                self.evictions += 1
+        return fig_json
+
+    def invalidate(self, builder=None):
+        """
+        Removes cached figures, e.g. after the data has changed.
+
+        :param builder: if given only the figures built by this function are removed, otherwise all figures are
+        """
+        with self._lock:
+            if builder is None:
+                self._figures.clear()
+            else:
+                name = self._builder_name(builder)
+                for key in [key for key in self._figures if key[0] == name]:
+                    del self._figures[key]
+
+    def stats(self):
+        """
+        :return: dict with the hit, miss and eviction counts and the current and maximum size
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._figures),
+                'maxsize': self.maxsize,
+            }
+
+    def _check_version(self):
+        if self._version is None:
+            return
+        data_version = self._version()
+        if data_version != self._data_version:
+            self._figures.clear()
+            if self._artifacts is not None and self._data_version is not None:
+                self._artifacts.validate()
+            self._data_version = data_version
+
+    @staticmethod
+    def _builder_name(builder):
+        return f'{builder.__module__}.{builder.__qualname__}'
+
+    @classmethod
+    def _make_key(cls, builder, args, kwargs):
+        return cls._builder_name(builder), args, tuple(sorted(kwargs.items()))
@@ -0,0 +1,55 @@
+""" Compares the JSON encoders Plotly (and so Dash) can use, by encode time and payload size, for every dashboard figure.
+
+    python -m paralympic_app.json_benchmark [repeats]
+"""
+import sys
+import timeit
+
+import plotly.io as pio
+
+try:
+    from . import create_charts as cc
+    from .figure_artifacts import FIGURE_VARIANTS, artifact_name
+except ImportError:  # Run as a script from within the package directory
+    import create_charts as cc
+    from figure_artifacts import FIGURE_VARIANTS, artifact_name
+
+ENGINES = ('json', 'orjson')
+
+
+def available_engines():
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        return ['json']
+    return list(ENGINES)
+
+
+def benchmark(repeats=20):
+    """
+    Encodes each figure in FIGURE_VARIANTS with each available engine.
+
+    :param repeats: number of times each figure is encoded; the fastest time is reported
+    :return: list of dicts with the figure name, engine, seconds per encode and payload size in bytes
+    """
+    results = []
+    for builder_name, args in FIGURE_VARIANTS:
+        fig = getattr(cc, builder_name)(*args)
+        for engine in available_engines():
+            timer = timeit.Timer(lambda: pio.to_json(fig, validate=False, engine=engine))
+            seconds = min(timer.repeat(repeat=repeats, number=1))
+            payload = pio.to_json(fig, validate=False, engine=engine).encode('utf-8')
+            results.append({
+                'figure': artifact_name(builder_name, args),
+                'engine': engine,
+                'seconds': seconds,
+                'bytes': len(payload),
+            })
+    return results
+
+
+if __name__ == '__main__':
+    repeat_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"{'figure':<40} {'engine':<8} {'ms':>8} {'bytes':>9}")
+    for result in benchmark(repeat_count):
+        print(f"{result['figure']:<40} {result['engine']:<8} {result['seconds'] * 1000:>8.3f} {result['bytes']:>9}")
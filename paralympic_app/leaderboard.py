@@ -0,0 +1,62 @@
+""" Top-N medal leaderboards answered from per-country cumulative medal counts. """
+import numpy as np
+import pandas as pd
+
+MEDAL_TYPES = ('Gold', 'Silver', 'Bronze', 'Total')
+EVENT_TYPES = ('Summer', 'Winter')
+
+
+class MedalLeaderboard:
+    """
+    Precomputes, for each medal type and for summer, winter and all games, a countries x years array of cumulative
+    medal counts. The medals a country won between two years is then the difference of two columns, and a top-N
+    query is a partition of one array rather than a groupby and a full sort of the medals data.
+
+    :param medals: DataFrame of the medals data with the summer/winter TYPE of each games added
+    """
+
+    def __init__(self, medals):
+        # A few rows have no country; like groupby('Country') leave them out rather than rank them as a country
+        medals = medals[medals['Country'].notna()]
+        self.countries, country_idx = np.unique(medals['Country'].to_numpy(dtype=str), return_inverse=True)
+        self.years, year_idx = np.unique(medals['Year'].to_numpy(), return_inverse=True)
+        types = medals['TYPE'].to_numpy()
+        self._cumulative = {}
+        for event_type in (None,) + EVENT_TYPES:
+            rows = np.ones(len(medals), dtype=bool) if event_type is None else types == event_type
+            for medal in MEDAL_TYPES:
+                # Column 0 is all zeros so that a range starting at the first year needs no special case
+                counts = np.zeros((len(self.countries), len(self.years) + 1), dtype=np.int64)
+                np.add.at(counts, (country_idx[rows], year_idx[rows] + 1), medals[medal].to_numpy()[rows])
+                self._cumulative[(event_type, medal)] = counts.cumsum(axis=1)
+
+    def top(self, medal='Gold', n=10, start_year=None, end_year=None, event_type=None):
+        """
+        Gets the countries that won the most medals of a type, optionally within a range of years and for only the
+        summer or winter paralympics. Countries that won none are left out; ties are ordered by country name.
+
+        :param medal: str one of 'Gold', 'Silver', 'Bronze' or 'Total'
+        :param n: int maximum number of countries to return
+        :param start_year: int first year to include, defaults to the first games
+        :param end_year: int last year to include, defaults to the latest games
+        :param event_type: str 'Summer' or 'Winter', defaults to both
+        :return: DataFrame with columns 'Country' and the medal type, highest first
+        """
+        if medal not in MEDAL_TYPES:
+            raise ValueError("Medal type must be one of %r." % (MEDAL_TYPES,))
+        if event_type is not None and event_type not in EVENT_TYPES:
+            raise ValueError("Event type must be one of %r." % (EVENT_TYPES,))
+        cumulative = self._cumulative[(event_type, medal)]
+        first = 0 if start_year is None else np.searchsorted(self.years, start_year, side='left')
+        last = len(self.years) if end_year is None else np.searchsorted(self.years, end_year, side='right')
+        totals = cumulative[:, max(last, first)] - cumulative[:, first]
+
+        candidates = np.flatnonzero(totals > 0)
+        n = max(int(n), 0)
+        if n < len(candidates):
+            # Partition on the n-th largest total, keeping every country tied with it so ties are broken by name
+            threshold = -np.partition(-totals[candidates], n - 1)[n - 1] if n else np.inf
+            candidates = candidates[totals[candidates] >= threshold]
+        order = np.lexsort((self.countries[candidates], -totals[candidates]))[:n]
+        top = candidates[order]
+        return pd.DataFrame({'Country': self.countries[top], medal: totals[top]})
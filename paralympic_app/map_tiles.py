@@ -0,0 +1,234 @@
+""" Map tile sources for the map figures, and a size-bounded on-disk cache of tiles for serving them locally.
+
+By default the map figures load their tiles straight from OpenStreetMap and the USGS. Given the URL of a tile proxy they
+load them from it instead, such as the endpoint the Flask app adds when TILE_PROXY_ENABLED is set, which serves tiles
+from a TileCache. The cache can be filled ahead of time, e.g. to run offline, from a directory of {z}/{x}/{y} tiles or an
+MBTiles file with:
+
+    python -m paralympic_app.map_tiles OSM path/to/tiles.mbtiles [cache directory]
+"""
+import http.client
+import os
+import sqlite3
+import sys
+import threading
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+
+# Upstream tile URL of each map style of scatter_mapbox_para_locations
+TILE_SOURCES = {
+    'OSM': 'https://tile.openstreetmap.org/{z}/{x}/{y}.png',
+    'USGS': 'https://basemap.nationalmap.gov/arcgis/rest/services/USGSImageryOnly/MapServer/tile/{z}/{y}/{x}',
+}
+TILE_ATTRIBUTION = {
+    'OSM': '© OpenStreetMap contributors',
+    'USGS': 'United States Geological Survey',
+}
+TILE_CACHE_DIR = Path(__file__).parent.joinpath('tiles')
+MAX_ZOOM = 22
+# OpenStreetMap's tile usage policy asks for a User-Agent that identifies the application
+USER_AGENT = 'paralympic_app tile cache'
+
+
+def tile_url(source, proxy_url=None):
+    """
+    :param source: str key of TILE_SOURCES
+    :param proxy_url: str URL of a tile proxy with {source}, {z}, {x} and {y} placeholders e.g.
+    '/dashboard/tiles/{source}/{z}/{x}/{y}', or None to load tiles from TILE_SOURCES
+    :return: str tile URL template, with {z}, {x} and {y} placeholders, for the map figures to load tiles from
+    """
+    if proxy_url is None:
+        return TILE_SOURCES[source]
+    return proxy_url.replace('{source}', source)
+
+
+def tile_urls():
+    """ :return: dict of the upstream tile URL of each source, that figures built without a proxy use """
+    return {source: tile_url(source) for source in TILE_SOURCES}
+
+
+def valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_mimetype(data):
+    """ :return: str content type of a tile, from its first bytes """
+    if data.startswith(b'\x89PNG'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8'):
+        return 'image/jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+class TileCache:
+    """
+    Tiles stored as files named {source}/{z}/{x}/{y} in a directory. When the files take up more than max_bytes the
+    least recently used are deleted. A missing tile is fetched from TILE_SOURCES if fetch is on.
+
+    The record of which tiles were used when is kept in memory, starting from the files' modification times, so it is
+    per process; with several processes the limit is applied by each of them.
+
+    :param cache_dir: directory to keep the tiles in, created if needed
+    :param max_bytes: maximum total size of the tiles
+    :param fetch: fetch tiles that are not in the cache from their upstream source
+    :param timeout: seconds to wait for an upstream tile
+    """
+
+    def __init__(self, cache_dir=TILE_CACHE_DIR, max_bytes=256 * 1024 * 1024, fetch=True, timeout=10):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.fetch = fetch
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sizes = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, source, z, x, y):
+        """
+        :return: bytes the tile, or None if it is not cached and cannot be fetched
+        """
+        if source not in TILE_SOURCES or not valid_tile(z, x, y):
+            return None
+        key = (source, z, x, y)
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            data = None
+        with self._lock:
+            index = self._index()
+            if data is not None:
+                self.hits += 1
+                if key in index:
+                    index.move_to_end(key)
+                return data
+            self.misses += 1
+        if not self.fetch:
+            return None
+        data = self._fetch(source, z, x, y)
+        if data is not None:
+            self.put(source, z, x, y, data)
+        return data
+
+    def put(self, source, z, x, y, data):
+        """ Adds a tile to the cache, evicting the least recently used tiles if it is then too large. """
+        key = (source, z, x, y)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so a tile being read is never half written
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            index = self._index()
+            self._total_bytes += len(data) - index.pop(key, 0)
+            index[key] = len(data)
+            while self._total_bytes > self.max_bytes and len(index) > 1:
+                old_key, size = index.popitem(last=False)
+                self._total_bytes -= size
+                self.evictions += 1
+                try:
+                    self._path(old_key).unlink()
+                except OSError:
+                    pass
+
+    def fill_from_directory(self, source, tile_dir):
+        """
+        Copies the tiles in a directory laid out as {z}/{x}/{y}, with any file extension, into the cache.
+
+        :return: int number of tiles copied
+        """
+        count = 0
+        for path in Path(tile_dir).glob('*/*/*'):
+            try:
+                z, x, y = int(path.parent.parent.name), int(path.parent.name), int(path.name.split('.')[0])
+            except ValueError:
+                continue
+            if path.is_file() and valid_tile(z, x, y):
+                self.put(source, z, x, y, path.read_bytes())
+                count += 1
+        return count
+
+    def fill_from_mbtiles(self, source, mbtiles_path):
+        """
+        Copies the tiles in an MBTiles file into the cache.
+
+        :return: int number of tiles copied
+        """
+        count = 0
+        connection = sqlite3.connect(f'file:{mbtiles_path}?mode=ro', uri=True)
+        try:
+            rows = connection.execute('SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles')
+            for z, x, tms_y, data in rows:
+                # MBTiles numbers rows from the bottom of the map, the {z}/{x}/{y} scheme from the top
+                y = 2 ** z - 1 - tms_y
+                if valid_tile(z, x, y):
+                    self.put(source, z, x, y, bytes(data))
+                    count += 1
+        finally:
+            connection.close()
+        return count
+
+    def stats(self):
+        """
+        :return: dict with the hit, miss and eviction counts and the number and total size of the cached tiles
+        """
+        with self._lock:
+            index = self._index()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'tiles': len(index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _path(self, key):
+        source, z, x, y = key
+        return self.cache_dir.joinpath(source, str(z), str(x), str(y))
+
+    def _index(self):
+        """ :return: OrderedDict of (source, z, x, y) to tile size, least recently used first; call with the lock held """
+        if self._sizes is None:
+            tiles = []
+            for path in self.cache_dir.glob('*/*/*/*'):
+                try:
+                    key = (path.parent.parent.parent.name, int(path.parent.parent.name), int(path.parent.name),
+                           int(path.name))
+                    stat = path.stat()
+                except (ValueError, OSError):
+                    continue
+                tiles.append((stat.st_mtime_ns, key, stat.st_size))
+            tiles.sort()
+            self._sizes = OrderedDict((key, size) for mtime, key, size in tiles)
+            self._total_bytes = sum(self._sizes.values())
+        return self._sizes
+
+    def _fetch(self, source, z, x, y):
+        url = TILE_SOURCES[source].format(z=z, x=x, y=y)
+        request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except (OSError, http.client.HTTPException):
+            # HTTPException covers a connection dropped mid-response, e.g. IncompleteRead
+            return None
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in TILE_SOURCES:
+        sys.exit(f"usage: python -m paralympic_app.map_tiles {{{','.join(TILE_SOURCES)}}} "
+                 "<tile directory or .mbtiles file> [cache directory]")
+    tile_cache = TileCache(sys.argv[3] if len(sys.argv) > 3 else TILE_CACHE_DIR, max_bytes=float('inf'))
+    if sys.argv[2].endswith('.mbtiles'):
+        copied = tile_cache.fill_from_mbtiles(sys.argv[1], sys.argv[2])
+    else:
+        copied = tile_cache.fill_from_directory(sys.argv[1], sys.argv[2])
+    print(f"{copied} tiles copied, {tile_cache.stats()['bytes']} bytes in {tile_cache.cache_dir}")
@@ -113,9 +113,9 @@ def update_output_div(event_variable):
 
     :param event_variable: one of the following which are columns in the paralympics dataset ['EVENTS', 'SPORTS',
     'COUNTRIES', 'PARTICIPANTS']
-    :return: plotly.px.Figure The line chart representing the chosen variable
+    :return: dict The line chart figure representing the chosen variable
     """
-    fig_line_time = cc.line_chart_over_time(event_variable)
+    fig_line_time = cc.figure_cache.get(cc.line_chart_over_time, event_variable)
     return fig_line_time
 
 
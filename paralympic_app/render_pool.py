@@ -0,0 +1,147 @@
+""" A pool of worker processes that build the create_charts figures, so figure building can use more than one core.
+
+Building a Plotly Express figure is CPU bound and holds the GIL, so threads give no parallelism. Each worker in the
+pool imports pandas, Plotly and create_charts and loads the dataset once, when the pool starts, then builds figures
+on request and returns them as JSON.
+
+Start the pool before the web server starts its threads: on Linux the workers are forked from the current process.
+"""
+import atexit
+import concurrent.futures
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+_warm = False
+
+
+def _warm_worker():
+    """ Runs once in each worker: loads the data and builds a figure so Plotly's lazy imports are done. """
+    global _warm
+    from paralympic_app import create_charts as cc
+    cc.get_dataset()
+    cc.line_chart_over_time('EVENTS').to_json()
+    _warm = True
+
+
+def _render(builder_name, args, kwargs):
+    from paralympic_app import create_charts as cc
+    return getattr(cc, builder_name)(*args, **kwargs).to_json()
+
+
+def _ping():
+    return _warm
+
+
+class FigureRenderPool:
+    """
+    Builds create_charts figures in a pool of pre-warmed worker processes.
+
+    :param processes: number of worker processes, defaults to the number of CPUs
+    :param timeout: seconds to wait for a figure before building it in the calling process instead
+    """
+
+    def __init__(self, processes=None, timeout=30):
+        self.processes = processes or os.cpu_count() or 1
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        # Tasks submitted and not yet finished, whether waiting for a worker or running
+        self._queued = 0
+        self._stats = {'completed': 0, 'errors': 0, 'timeouts': 0, 'restarts': 0, 'fallbacks': 0, 'max_queue_depth': 0,
+                       'total_seconds': 0.0}
+
+    def start(self):
+        """ Starts the worker processes and waits until each has loaded the data. """
+        if self._executor is not None:
+            return self
+        self._executor = self._new_executor()
+        # The executor starts a worker per submitted task until it reaches max_workers
+        for future in [self._executor.submit(_ping) for _ in range(self.processes)]:
+            future.result()
+        atexit.register(self.shutdown)
+        return self
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def render(self, builder, args=(), kwargs=None):
+        """
+        Builds a figure in a worker process. If the worker does not finish within the timeout, or the pool is broken
+        because a worker died, the figure is built in the calling process instead, and a broken pool is replaced so
+        later figures use the workers again.
+
+        :param builder: create_charts function, or its name
+        :param args: tuple of arguments to the function
+        :param kwargs: dict of keyword arguments to the function
+        :return: str JSON figure
+        """
+        executor = self._executor
+        if executor is None:
+            raise RuntimeError("The figure render pool has not been started.")
+        builder_name = builder if isinstance(builder, str) else builder.__name__
+        args, kwargs = tuple(args), kwargs or {}
+        start = time.perf_counter()
+        try:
+            future = executor.submit(_render, builder_name, args, kwargs)
+        except BrokenProcessPool:
+            self._restart(executor)
+            return self._render_here(builder_name, args, kwargs)
+        with self._lock:
+            self._queued += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queued)
+        future.add_done_callback(self._task_done)
+        try:
+            fig_json = future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            # A task already running in a worker cannot be stopped, only one still queued can be cancelled
+            future.cancel()
+            self._count('timeouts')
+            return self._render_here(builder_name, args, kwargs)
+        except BrokenProcessPool:
+            self._restart(executor)
+            return self._render_here(builder_name, args, kwargs)
+        except Exception:
+            self._count('errors')
+            raise
+        with self._lock:
+            self._stats['completed'] += 1
+            self._stats['total_seconds'] += time.perf_counter() - start
+        return fig_json
+
+    def stats(self):
+        """
+        :return: dict with the number of workers, the number of tasks waiting or running now and the most seen at once,
+        the completed, failed and timed out task counts, and how often the pool was replaced and figures were built
+        in the calling process
+        """
+        with self._lock:
+            stats = dict(self._stats, workers=self.processes if self._executor else 0, queue_depth=self._queued)
+        return stats
+
+    def _new_executor(self):
+        return concurrent.futures.ProcessPoolExecutor(max_workers=self.processes, initializer=_warm_worker)
+
+    def _restart(self, broken):
+        """ Replaces a broken executor, unless another thread already has; the new workers warm up on first use """
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._new_executor()
+            self._stats['restarts'] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _render_here(self, builder_name, args, kwargs):
+        self._count('fallbacks')
+        return _render(builder_name, args, kwargs)
+
+    def _task_done(self, future):
+        with self._lock:
+            self._queued -= 1
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
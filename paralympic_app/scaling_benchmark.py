@@ -0,0 +1,269 @@
+""" Times the create_charts functions and the dashboard callbacks, and measures their peak memory, on synthetic data
+of increasing size, to show how they scale.
+
+    python -m paralympic_app.scaling_benchmark run --sizes 1e3 1e4 1e5 1e6 -o before.json
+    python -m paralympic_app.scaling_benchmark compare before.json after.json
+
+Each run writes a JSON file of results, one per function per size, with the library versions and git commit it ran
+on; compare prints the change in time and memory between two runs and flags the slowdowns.
+"""
+import argparse
+import datetime
+import inspect
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly
+
+try:
+    from . import create_charts as cc
+    from .dataset import ParalympicDataset, using_dataset
+    from .figure_artifacts import FIGURE_VARIANTS, artifact_name
+    from .figure_cache import FigureCache
+    from .synthetic_data import write_dataset
+except ImportError:  # Run as a script from within the package directory
+    import create_charts as cc
+    from dataset import ParalympicDataset, using_dataset
+    from figure_artifacts import FIGURE_VARIANTS, artifact_name
+    from figure_cache import FigureCache
+    from synthetic_data import write_dataset
+
+SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+REPEATS = 3
+# A result is flagged by compare when it is this much slower, or uses this much more memory, than before
+REGRESSION_THRESHOLD = 0.2
+# Smaller changes are within the noise of timing and of tracemalloc, whatever their ratio
+MIN_SECONDS_CHANGE = 0.001
+MIN_BYTES_CHANGE = 64 * 1024
+
+
+def chart_cases(dataset):
+    """
+    :param dataset: the loaded ParalympicDataset the functions will run on
+    :return: list of (kind, name, function) for every create_charts figure ('chart') and data function ('data') the
+    dashboard uses
+    """
+    events = dataset.events()
+    location, year = events['LOCATION'].iloc[-1], int(events['YEAR'].iloc[-1])
+    npc = dataset.medals()['NPC'].iloc[0]
+    cases = []
+    for builder_name, args in FIGURE_VARIANTS:
+        builder = getattr(cc, builder_name)
+        # Serializing is part of the cost, every figure is sent to the browser as JSON
+        cases.append(('chart', artifact_name(builder_name, args),
+                      lambda builder=builder, args=args: builder(*args).to_json()))
+    cases += [
+        ('data', 'top_medals_data-Gold-10', lambda: cc.top_medals_data('Gold', 10)),
+        ('data', 'top_medals_data-Total-10-Summer', lambda: cc.top_medals_data('Total', 10, event_type='Summer')),
+        ('data', 'get_medals_table_data', lambda: cc.get_medals_table_data(location, year)),
+        ('data', 'get_country_results', lambda: cc.get_country_results(npc)),
+        ('data', 'get_event_highlights', lambda: cc.get_event_highlights(location, year)),
+        ('data', 'leaderboard_years', cc.leaderboard_years),
+    ]
+    try:
+        cc.choropleth_mapbox_medals(cc.get_medals_table_data(location, year))
+    except FileNotFoundError:
+        pass  # No country geometry, see country_geometry.py
+    else:
+        cases.append(('chart', 'choropleth_mapbox_medals',
+                      lambda: cc.choropleth_mapbox_medals(cc.get_medals_table_data(location, year)).to_json()))
+    return cases
+
+
+def callback_cases(dataset):
+    """
+    Registers the dashboard callbacks on a new Dash app and returns them with arguments like those the dashboard sends.
+    Figures are not cached between calls, so each call builds its figure.
+
+    :param dataset: the loaded ParalympicDataset the callbacks will run on
+    :return: list of (name, function), empty if the dashboard cannot be imported
+    """
+    try:
+        import dash
+        from example_app.paralympic_app.callbacks import register_callbacks
+    except ImportError:
+        return []
+    dash_app = dash.Dash(__name__)
+    register_callbacks(dash_app)
+    events = dataset.events()
+    last = events.iloc[-1]
+    years = cc.leaderboard_years()
+    arguments = {
+        'update_output_div': ('EVENTS',),
+        'display_hover_data': ({'points': [{'customdata': [last['LAT'], last['LON'], last['LOCATION'],
+                                                           int(last['YEAR']), last['TYPE']]}]},),
+        'update_leaderboard': ('Gold', 10, [years[0], years[-1]], ['Summer', 'Winter']),
+        'update_map_style': ('USGS',),
+    }
+    cases = []
+    for callback in dash_app.callback_map.values():
+        if 'callback' not in callback:
+            continue
+        # The function as written, without the Dash and metrics wrappers, which need a request
+        function = inspect.unwrap(callback['callback'])
+        if function.__name__ in arguments:
+            cases.append((function.__name__, _uncached(function, arguments[function.__name__])))
+    return sorted(cases)
+
+
+def _uncached(function, args):
+    def call():
+        cc.figure_cache.invalidate()
+        return function(*args)
+
+    return call
+
+
+def measure(function, repeats=REPEATS):
+    """
+    Times a function, then runs it once more with tracemalloc, which slows it down, to find its peak memory.
+
+    :return: dict with the fastest and median seconds and the peak bytes allocated during a call
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        function()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return {'seconds_min': min(times), 'seconds_median': statistics.median(times), 'peak_bytes': peak}
+
+
+def run(sizes=SIZES, repeats=REPEATS, seed=0, progress=None):
+    """
+    Benchmarks every chart function and callback on synthetic data of each size.
+
+    :param sizes: numbers of medals rows
+    :param repeats: times each function is timed
+    :param seed: seed of the synthetic data
+    :param progress: optional function called with each result as it is measured
+    :return: list of result dicts with the size, kind ('data', 'chart' or 'callback'), name and measurements, see
+    measure
+    """
+    results = []
+    saved_cache = cc.figure_cache
+    # Without the prebuilt figures, which are of the real data
+    cc.figure_cache = FigureCache(maxsize=32, version=lambda: cc.get_dataset().version)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as data_dir:
+                events_filepath, medals_filepath = write_dataset(data_dir, size, seed=seed)
+                cases = [('data', 'load_dataset', lambda: ParalympicDataset(events_filepath, medals_filepath).load())]
+                with using_dataset(ParalympicDataset(events_filepath, medals_filepath)) as dataset:
+                    cc.figure_cache.invalidate()
+                    cases += chart_cases(dataset)
+                    cases += [('callback', name, function) for name, function in callback_cases(dataset)]
+                    for kind, name, function in cases:
+                        result = dict(size=size, kind=kind, name=name, **measure(function, repeats))
+                        results.append(result)
+                        if progress is not None:
+                            progress(result)
+    finally:
+        cc.figure_cache = saved_cache
+    return results
+
+
+def environment():
+    """ :return: dict describing what the benchmark ran on, so that results can be matched up """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plotly': plotly.__version__,
+    }
+
+
+def compare(before, after, threshold=REGRESSION_THRESHOLD):
+    """
+    :param before: dict results file of the earlier run
+    :param after: dict results file of the later run
+    :return: list of dicts for the results in both runs, with the time and peak memory ratios, after / before, and
+    whether either is a regression, by more than the threshold and the noise
+    """
+    earlier = {(result['size'], result['name']): result for result in before['results']}
+    rows = []
+    for result in after['results']:
+        old = earlier.get((result['size'], result['name']))
+        if old is None:
+            continue
+        time_ratio = result['seconds_min'] / old['seconds_min'] if old['seconds_min'] else float('inf')
+        memory_ratio = result['peak_bytes'] / old['peak_bytes'] if old['peak_bytes'] else 1.0
+        rows.append({
+            'size': result['size'],
+            'name': result['name'],
+            'seconds_before': old['seconds_min'],
+            'seconds_after': result['seconds_min'],
+            'time_ratio': time_ratio,
+            'memory_ratio': memory_ratio,
+            'regression': (time_ratio > 1 + threshold
+                           and result['seconds_min'] - old['seconds_min'] > MIN_SECONDS_CHANGE
+                           or memory_ratio > 1 + threshold
+                           and result['peak_bytes'] - old['peak_bytes'] > MIN_BYTES_CHANGE),
+        })
+    return rows
+
+
+def _print_result(result):
+    print(f"{result['size']:>9} {result['kind']:<8} {result['name']:<44} {result['seconds_min'] * 1000:>10.2f} ms "
+          f"{result['peak_bytes'] / 2 ** 20:>9.1f} MiB", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark create_charts and the dashboard callbacks at scale.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the benchmark')
+    run_parser.add_argument('--sizes', nargs='+', type=float, default=SIZES, help='numbers of medals rows')
+    run_parser.add_argument('--repeats', type=int, default=REPEATS)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('-o', '--output', help='results file to write')
+    compare_parser = commands.add_parser('compare', help='compare two results files')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        sizes = [int(size) for size in args.sizes]
+        results = run(sizes, args.repeats, args.seed, progress=_print_result)
+        if args.output:
+            report = {'environment': environment(), 'repeats': args.repeats, 'seed': args.seed, 'sizes': sizes,
+                      'results': results}
+            Path(args.output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+        return 0
+
+    before = json.loads(Path(args.before).read_text(encoding='utf-8'))
+    after = json.loads(Path(args.after).read_text(encoding='utf-8'))
+    rows = compare(before, after, args.threshold)
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['size']:>9} {row['name']:<44} {row['seconds_before'] * 1000:>10.2f} -> "
+              f"{row['seconds_after'] * 1000:>10.2f} ms  x{row['time_ratio']:.2f} time  x{row['memory_ratio']:.2f} "
+              f"memory  {flag}")
+    return 1 if any(row['regression'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
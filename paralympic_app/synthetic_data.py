@@ -0,0 +1,163 @@
+""" Synthetic paralympic events and medals data, with the same columns and types as the real CSV files, at any size.
+
+The data is random but keeps the structure create_charts relies on: each medals row belongs to one games in the events
+data, a country appears at most once per games, ranks follow the medal counts and every row has at least one medal.
+
+    python -m paralympic_app.synthetic_data <medal rows> <output directory> [seed]
+
+writes a paralympics.csv and an all_medals.csv that ParalympicDataset can read.
+"""
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .dataset import EVENT_DATA_FILEPATH, EVENT_DTYPES, MEDALS_DATA_FILEPATH, MEDALS_DTYPES
+except ImportError:  # Imported as a top-level module when paralympic_app.py is run as a script
+    from dataset import EVENT_DATA_FILEPATH, EVENT_DTYPES, MEDALS_DATA_FILEPATH, MEDALS_DTYPES
+
+FIRST_YEAR = 1960
+# About as many countries take part in each games as in recent real ones
+COUNTRIES_PER_GAMES = 150
+DISABILITIES = ('Spinal injury', 'Amputee', 'Vision Impairment', 'Cerebral Palsy', 'Les Autres',
+                'Intellectual Disability')
+_MONTHS = np.array(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
+_LETTERS = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+
+
+def country_codes(n):
+    """ :return: array of n distinct three letter codes, 'AAA', 'AAB', ... up to 26 ** 3 of them """
+    if n > 26 ** 3:
+        raise ValueError("There are only %d three letter country codes." % 26 ** 3)
+    i = np.arange(n)
+    return np.char.add(np.char.add(_LETTERS[i // 676], _LETTERS[i // 26 % 26]), _LETTERS[i % 26])
+
+
+def generate_events(n_events, seed=0):
+    """
+    Generates the events data, alternating summer and winter games every two years from 1960.
+
+    :param n_events: number of paralympic games
+    :param seed: random seed
+    :return: DataFrame with the columns and dtypes of paralympics.csv
+    """
+    rng = np.random.default_rng(seed)
+    i = np.arange(n_events)
+    event_type = np.where(i % 2 == 0, 'Summer', 'Winter')
+    year = FIRST_YEAR + 2 * i
+    location = np.char.add('City ', i.astype(str))
+    start_day = rng.integers(1, 20, n_events)
+    month = _MONTHS[np.where(event_type == 'Summer', rng.integers(6, 10, n_events), rng.integers(0, 3, n_events))]
+    yy = np.char.zfill((year % 100).astype(str), 2)
+    male = rng.integers(100, 3000, n_events).astype('float64')
+    female = np.round(male * rng.uniform(0.2, 0.8, n_events))
+    participants = (male + female).astype('int64')
+    # The first real games has no male/female split
+    male[0] = female[0] = np.nan
+    events = pd.DataFrame({
+        'REF': np.char.add(np.where(event_type == 'Summer', 'S', 'W'), (i // 2 + 1).astype(str)),
+        'TYPE': event_type,
+        'YEAR': year,
+        'MERGE_COL': location,
+        'LOCATION': location,
+        'LAT': rng.uniform(-60, 70, n_events).round(4),
+        'LON': rng.uniform(-180, 180, n_events).round(4),
+        'NOC': country_codes(COUNTRIES_PER_GAMES)[rng.integers(0, COUNTRIES_PER_GAMES, n_events)],
+        'START': np.char.add(np.char.add(np.char.add(np.char.zfill(start_day.astype(str), 2), '-'),
+                                         np.char.add(month, '-')), yy),
+        'END': np.char.add(np.char.add(np.char.add(np.char.zfill((start_day + 9).astype(str), 2), '-'),
+                                       np.char.add(month, '-')), yy),
+        'DISABILITIES_INCLUDED': [', '.join(DISABILITIES[:k]) for k in rng.integers(1, len(DISABILITIES) + 1,
+                                                                                    n_events)],
+        'EVENTS': rng.integers(50, 1000, n_events),
+        'SPORTS': rng.integers(2, 23, n_events),
+        'COUNTRIES': rng.integers(16, 165, n_events),
+        'MALE': male,
+        'FEMALE': female,
+        'PARTICIPANTS': participants,
+        'HIGHLIGHTS': np.char.add('Synthetic highlights of games ', i.astype(str)),
+    })
+    return events.astype(EVENT_DTYPES)
+
+
+def generate_medals(events, n_rows, seed=0):
+    """
+    Generates the medals data for a set of games, spreading n_rows medal table entries evenly across them.
+
+    :param events: DataFrame from generate_events
+    :param n_rows: number of rows
+    :param seed: random seed
+    :return: DataFrame with the columns and dtypes of all_medals.csv, ordered by games then rank
+    """
+    rng = np.random.default_rng(seed + 1)
+    n_events = len(events)
+    per_games = np.full(n_events, n_rows // n_events)
+    per_games[:n_rows % n_events] += 1
+    n_countries = max(COUNTRIES_PER_GAMES, int(per_games.max()))
+    if n_countries > 26 ** 3:
+        raise ValueError("Too many rows per games for every country to have its own code, use more games.")
+    codes = country_codes(n_countries)
+    names = np.char.add('Country ', codes)
+
+    games = np.repeat(np.arange(n_events), per_games)
+    position = np.arange(n_rows) - np.repeat(np.cumsum(per_games) - per_games, per_games)
+    # A window of a shuffled country list, starting at a random place for each games, so no country is repeated
+    order = rng.permutation(n_countries)
+    country = order[(rng.integers(0, n_countries, n_events)[games] + position) % n_countries]
+
+    # Medal counts fall away with a country's place in the table
+    scale = 60.0 / np.sqrt(position + 1)
+    gold, silver, bronze = (rng.poisson(scale) for _ in range(3))
+    bronze += (gold + silver + bronze) == 0
+    total = gold + silver + bronze
+    # Rank within each games by gold, then silver, then bronze
+    ordered = np.lexsort((-bronze, -silver, -gold, games))
+    rank = np.empty(n_rows, dtype=np.int64)
+    rank[ordered] = position + 1
+
+    medals = pd.DataFrame({
+        'Rank': rank,
+        'Country': names[country],
+        'NPC': codes[country],
+        'Gold': gold,
+        'Silver': silver,
+        'Bronze': bronze,
+        'Total': total,
+        'Event': events['MERGE_COL'].to_numpy()[games],
+        'Year': events['YEAR'].to_numpy()[games],
+    })
+    return medals.iloc[ordered].reset_index(drop=True).astype(MEDALS_DTYPES)
+
+
+def write_dataset(out_dir, n_medals, n_events=None, seed=0):
+    """
+    Generates and writes a synthetic events and medals data set.
+
+    :param out_dir: directory to write paralympics.csv and all_medals.csv to, created if needed
+    :param n_medals: number of medals rows
+    :param n_events: number of games, defaults to enough for COUNTRIES_PER_GAMES countries per games, but at least
+    the 27 of the real data
+    :param seed: random seed
+    :return: (Path events file, Path medals file)
+    """
+    if n_events is None:
+        n_events = max(27, math.ceil(n_medals / COUNTRIES_PER_GAMES))
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    events = generate_events(n_events, seed)
+    medals = generate_medals(events, n_medals, seed)
+    events_filepath = out_dir.joinpath(EVENT_DATA_FILEPATH.name)
+    medals_filepath = out_dir.joinpath(MEDALS_DATA_FILEPATH.name)
+    events.to_csv(events_filepath, index=False)
+    medals.to_csv(medals_filepath, index=False)
+    return events_filepath, medals_filepath
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit("usage: python -m paralympic_app.synthetic_data <medal rows> <output directory> [seed]")
+    for path in write_dataset(sys.argv[2], int(float(sys.argv[1])), seed=int(sys.argv[3]) if len(sys.argv) > 3 else 0):
+        print(path)
@@ -0,0 +1,199 @@
+""" Seeds reference data tables from the CSV files they come from, for the Flask apps that use this data.
+
+The checksum of each seed file is stored in a seed_checksum table when it is applied, and a seed whose file has not
+changed since is skipped. A changed file is applied as the difference from what is in the table: new and changed rows
+are upserted in batches on the table's natural key, so existing rows keep their ids, and rows no longer in the file
+are deleted unless they must be kept. Each app describes its tables with Seed and runs them with seed_table, at
+startup or from its own seed CLI, see example_app/seed.py.
+"""
+import argparse
+import csv
+import datetime
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import Column, DateTime, MetaData, Table, Text, inspect, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+BATCH_SIZE = 500
+# Values pandas reads as missing
+MISSING_VALUES = {'', 'NA', 'N/A', 'NaN', 'nan', 'null', 'NULL', '#N/A'}
+
+seed_checksum_table = Table(
+    'seed_checksum', MetaData(),
+    Column('name', Text, primary_key=True),
+    Column('sha256', Text, nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+@dataclass
+class Seed:
+    """
+    A table seeded from a CSV file.
+
+    :param name: name the file's checksum is stored under
+    :param filepath: path to the CSV file
+    :param table: SQLAlchemy Table to seed
+    :param key: name of the natural key column, which identifies a row in both the file and the table
+    :param read_rows: function of the filepath returning a list of dicts, one per row, of the key and value columns
+    :param keep: optional function returning the set of keys of rows that must not be deleted, e.g. rows in use
+    """
+    name: str
+    filepath: object
+    table: Table
+    key: str
+    read_rows: Callable
+    keep: Optional[Callable] = None
+
+
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_csv(filepath):
+    """ :return: list of dicts of the rows of a CSV file, with values stripped and missing values as None """
+    with open(filepath, newline='', encoding='utf-8') as f:
+        return [{name: None if value is None or value.strip() in MISSING_VALUES else value.strip()
+                 for name, value in row.items()} for row in csv.DictReader(f)]
+
+
+def applied_checksums(session):
+    """ :return: dict of the name of each seed applied to the database to the sha256 of its file """
+    try:
+        return dict(session.execute(select(seed_checksum_table.c.name, seed_checksum_table.c.sha256)).all())
+    except (OperationalError, ProgrammingError):
+        # No seed_checksum table, nothing has been seeded
+        session.rollback()
+        return {}
+
+
+def applied_version(session, name):
+    """
+    A cheap lookup of the primary key, for processes that cache data read from a seeded table to tell when another
+    process, e.g. the seed CLI, has reseeded it.
+
+    :return: (sha256, applied_at) of the last time the named seed was applied, or None if it has not been
+    """
+    try:
+        row = session.execute(select(seed_checksum_table.c.sha256, seed_checksum_table.c.applied_at)
+                              .where(seed_checksum_table.c.name == name)).first()
+    except (OperationalError, ProgrammingError):
+        session.rollback()
+        return None
+    return tuple(row) if row is not None else None
+
+
+def seed_table(session, seed, force=False):
+    """
+    Brings a table up to date with its seed file, unless the file has not changed since it was last applied, in one
+    transaction.
+
+    :param session: SQLAlchemy session of the database
+    :param seed: Seed
+    :param force: apply the file even if its checksum has not changed
+    :return: dict with the seed name, whether it was skipped and the numbers of rows upserted and deleted
+    """
+    engine = session.get_bind()
+    seed_checksum_table.create(engine, checkfirst=True)
+    checksum = file_sha256(seed.filepath)
+    if applied_checksums(session).get(seed.name) == checksum and not force:
+        return {'seed': seed.name, 'skipped': True}
+    _restore_schema(engine, seed.table, seed.key)
+    try:
+        counts = _apply(session, seed)
+        statement = insert(seed_checksum_table).values(name=seed.name, sha256=checksum,
+                                                      applied_at=datetime.datetime.utcnow())
+        session.execute(statement.on_conflict_do_update(
+            index_elements=['name'], set_={'sha256': statement.excluded.sha256,
+                                           'applied_at': statement.excluded.applied_at}))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return dict(seed=seed.name, skipped=False, **counts)
+
+
+def _apply(session, seed):
+    table = seed.table
+    key = table.c[seed.key]
+    rows = {row[seed.key]: row for row in seed.read_rows(seed.filepath) if row[seed.key] is not None}
+    value_names = sorted({name for row in rows.values() for name in row} - {seed.key})
+    existing = {row[0]: dict(zip(value_names, row[1:]))
+                for row in session.execute(select(key, *[table.c[name] for name in value_names]))}
+    changed = [row for row_key, row in rows.items()
+               if row_key not in existing or existing[row_key] != {name: row.get(name) for name in value_names}]
+    for start in range(0, len(changed), BATCH_SIZE):
+        statement = insert(table)
+        if value_names:
+            statement = statement.on_conflict_do_update(
+                index_elements=[seed.key], set_={name: statement.excluded[name] for name in value_names})
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=[seed.key])
+        session.execute(statement, changed[start:start + BATCH_SIZE])
+    kept = seed.keep() if seed.keep is not None else set()
+    old_keys = [row_key for row_key in existing if row_key not in rows and row_key not in kept]
+    for start in range(0, len(old_keys), BATCH_SIZE):
+        session.execute(table.delete().where(key.in_(old_keys[start:start + BATCH_SIZE])))
+    return {'upserted': len(changed), 'deleted': len(old_keys)}
+
+
+def _restore_schema(engine, table, key):
+    """
+    Recreates a table that was written by pandas to_sql, which replaces the model's schema and drops its primary key
+    and constraints, copying over the columns the two have in common if the model's required columns are among them.
+    Also adds the unique index on the natural key that the upserts need, for tables created before it was unique.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table(table.name):
+        return
+    with engine.begin() as connection:
+        if not inspector.get_pk_constraint(table.name)['constrained_columns']:
+            names = [column['name'] for column in inspector.get_columns(table.name) if column['name'] in table.c]
+            required = {column.name for column in table.c if not column.nullable and not column.primary_key}
+            connection.exec_driver_sql(f'ALTER TABLE {table.name} RENAME TO {table.name}_old')
+            table.create(connection)
+            if names and required <= set(names):
+                columns = ', '.join(names)
+                connection.exec_driver_sql(f'INSERT INTO {table.name} ({columns}) '
+                                           f'SELECT {columns} FROM {table.name}_old')
+            connection.exec_driver_sql(f'DROP TABLE {table.name}_old')
+        unique = [constraint['column_names'] for constraint in inspect(connection).get_unique_constraints(table.name)]
+        unique += [index['column_names'] for index in inspect(connection).get_indexes(table.name) if index['unique']]
+        if [key] not in unique:
+            connection.exec_driver_sql(f'CREATE UNIQUE INDEX uq_{table.name}_{key} ON {table.name} ({key})')
+
+
+def seed_cli(db, import_models, seed_all, default_config, argv=None):
+    """
+    Command line seeding of an app's database, without creating the whole app, which might seed on startup.
+
+    :param db: the app's SQLAlchemy object
+    :param import_models: function that imports the app's models, so that create_all creates their tables
+    :param seed_all: the app's function that applies its seeds, taking force
+    :param default_config: dotted name of the config class to use by default
+    """
+    from flask import Flask
+
+    parser = argparse.ArgumentParser(description='Seed the reference data tables of the database.')
+    parser.add_argument('--config', default=default_config, help='config class to use')
+    parser.add_argument('--force', action='store_true', help='apply the seed files even if they have not changed')
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    app.config.from_object(args.config)
+    db.init_app(app)
+    with app.app_context():
+        import_models()
+        db.create_all()
+        for result in seed_all(args.force):
+            if result['skipped']:
+                print(f"{result['seed']}: unchanged, skipped")
+            else:
+                print(f"{result['seed']}: {result['upserted']} upserted, {result['deleted']} deleted")
@@ -0,0 +1,18 @@
+import pandas as pd
+import pytest
+
+from paralympic_app.dataset import get_dataset, read_only
+
+
+def test_read_only_skips_extension_arrays():
+    df = read_only(pd.DataFrame({'Country': pd.array(['Norway', 'Austria'], dtype='string[pyarrow]'),
+                                 'Gold': [3, 1]}))
+    with pytest.raises(ValueError):
+        df.loc[0, 'Gold'] = 10
+    assert df['Gold'].tolist() == [3, 1]
+
+
+def test_dataset_frames_are_read_only():
+    medals = get_dataset().medals()
+    with pytest.raises(ValueError):
+        medals.iloc[0, medals.columns.get_loc('Gold')] = -1
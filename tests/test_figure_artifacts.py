@@ -0,0 +1,21 @@
+import json
+
+from paralympic_app import figure_artifacts as fa
+
+
+def test_chart_modules_include_every_module_the_figures_come_from():
+    names = {path.name for path in fa.chart_modules()}
+    assert {'create_charts.py', 'dataset.py', 'leaderboard.py', 'data_cache.py', 'map_tiles.py'} <= names
+
+
+def test_artifacts_built_by_other_code_are_ignored(tmp_path):
+    fa.build_artifacts(tmp_path)
+    artifacts = fa.FigureArtifacts(tmp_path)
+    assert artifacts.get_json('table_top_medals', ()) is not None
+
+    manifest_path = tmp_path.joinpath(fa.MANIFEST_FILENAME)
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    manifest['code']['leaderboard.py'] = '0' * 64
+    manifest_path.write_text(json.dumps(manifest), encoding='utf-8')
+    artifacts.validate()
+    assert artifacts.get_json('table_top_medals', ()) is None
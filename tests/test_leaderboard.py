@@ -0,0 +1,27 @@
+import pandas as pd
+
+import paralympic_app.create_charts as cc
+from paralympic_app.leaderboard import MedalLeaderboard
+
+
+def test_rows_without_a_country_are_not_ranked():
+    medals = pd.DataFrame({'Country': ['Norway', None, 'Austria'], 'Year': [1988, 1988, 1988],
+                           'TYPE': ['Winter'] * 3, 'Gold': [3, 9, 1], 'Silver': [0, 0, 0], 'Bronze': [0, 0, 0],
+                           'Total': [3, 9, 1]})
+    top = MedalLeaderboard(medals).top('Total', 10)
+    assert top['Country'].tolist() == ['Norway', 'Austria']
+
+
+def test_top_medals_matches_groupby():
+    medals = cc.get_dataset().medals()
+    expected = medals.groupby('Country')['Total'].sum()
+    top = cc.top_medals_data('Total', 500)
+    assert len(top) == len(expected[expected > 0])
+    assert 'None' not in top['Country'].tolist()
+    assert dict(zip(top['Country'], top['Total'])) == expected[expected > 0].to_dict()
+
+
+def test_winter_1988_has_no_missing_country():
+    top = cc.top_medals_data('Total', 14, 1988, 1988, 'Winter')
+    assert 'None' not in top['Country'].tolist()
+    assert top['Country'].notna().all()
@@ -0,0 +1,84 @@
+import pytest
+
+from example_app import create_app, db
+from example_app.config import TestingConfig
+from example_app.search import search_profiles
+
+
+@pytest.fixture
+def app(tmp_path):
+    class SearchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path.joinpath('search.sqlite'))
+        SQLALCHEMY_ECHO = False
+        SEED_ON_STARTUP = False
+
+    app = create_app(SearchConfig)
+    with app.app_context():
+        yield app
+
+
+def add_profiles(start, count):
+    """ Adds profiles of which about half match 'swim', some in the username and some only in the bio """
+    from example_app.models import Profile
+
+    matching = set()
+    for i in range(start, start + count):
+        if i % 5 == 0:
+            username, bio = f'swimmer{i}', 'likes the pool'
+        elif i % 5 in (1, 2):
+            username, bio = f'athlete{i}', f'I swim {i % 3 + 1} times a week'
+        else:
+            username, bio = f'runner{i}', 'runs every day'
+        profile = Profile(username=username, bio=bio, user_id=1)
+        db.session.add(profile)
+        db.session.flush()
+        if 'swim' in username or 'swim' in bio:
+            matching.add(profile.id)
+    db.session.commit()
+    return matching
+
+
+def test_pages_cover_every_match_forwards_and_backwards(app):
+    matching = add_profiles(0, 60)
+    pages, after = [], None
+    while True:
+        profiles, previous_page, after = search_profiles('swim', after=after, per_page=7)
+        pages.append((previous_page, [profile.id for profile in profiles]))
+        if after is None:
+            break
+    seen = [profile_id for previous_page, ids in pages for profile_id in ids]
+    assert sorted(seen) == sorted(matching)
+    # Username matches come first
+    assert all(profile_id % 5 == 1 for profile_id in seen[:12])
+
+    before = pages[-1][0]
+    for previous_page, ids in reversed(pages[:-1]):
+        profiles, before, next_page = search_profiles('swim', before=before, per_page=7)
+        assert [profile.id for profile in profiles] == ids
+
+
+def test_profiles_added_between_pages_do_not_hide_earlier_matches(app):
+    original = add_profiles(0, 60)
+    profiles, previous_page, after = search_profiles('swim', per_page=10)
+    seen = [profile.id for profile in profiles]
+    add_profiles(60, 40)
+    while after is not None:
+        profiles, previous_page, after = search_profiles('swim', after=after, per_page=10)
+        seen += [profile.id for profile in profiles]
+    assert original <= set(seen)
+    assert len(seen) == len(set(seen))
+
+
+def test_cursor_is_a_bucket_and_profile_id():
+    from example_app.search import make_cursor, parse_cursor
+
+    assert parse_cursor(make_cursor(1, 42)) == (1, 42)
+    # Score cursors from before the cursor was keyed on the bucket, and made up ones, start from the first page
+    for cursor in ('-3.25_42', '7_42', '1_x', '1', None):
+        assert parse_cursor(cursor) is None
+
+
+def test_invalid_cursor_gives_the_first_page(app):
+    add_profiles(0, 20)
+    first_page = search_profiles('swim', per_page=5)
+    assert search_profiles('swim', after='-3.25_4', per_page=5) == first_page